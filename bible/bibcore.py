@@ -1,8 +1,6 @@
 #!/usr/bin/env python
 """
 """
-from wx.core import NO
-
 from .biblang import L18N
 
 
@@ -47,6 +45,9 @@ class BibleInfo:
 class Verse:
     """Verse class contains verse number and text."""
 
+    # There are tens of thousands of verses in a Bible, so avoid per instance __dict__.
+    __slots__ = ("no", "text", "_number1", "_number2", "chapter", "book")
+
     def __init__(self):
         self.no = None  # Can be a string based a single number('1') or two (i.e. '2-3')
         # with 1 based index
@@ -120,6 +121,8 @@ class Verse:
 class Chapter:
     """Chapter class contains list of verses."""
 
+    __slots__ = ("no", "verses")
+
     def __init__(self):
         self.no = None  # int start from 1
         self.verses = []
@@ -128,11 +131,14 @@ class Chapter:
 class Book:
     """Book class contains list of chapters."""
 
+    __slots__ = ("new_testament", "name", "short_name", "chapters", "partial_chapters")
+
     def __init__(self):
         self.new_testament = False  # either old or new testament
         self.name = None
         self.short_name = None
         self.chapters = []
+        self.partial_chapters = {}  # chapter no to Chapter loaded by Bible.ensure_chapter_loaded()
 
     def is_loaded(self):
         return len(self.chapters) > 0
@@ -158,6 +164,26 @@ class Bible:
             book_no = self.books.index(book)
             if book_no != -1:
                 self.reader.read_book(book, book_no)
+                # The chapters read by ensure_chapter_loaded() are not used once the whole book is loaded.
+                book.partial_chapters.clear()
+
+    def ensure_chapter_loaded(self, book, chapter_no):
+        """The ensure_chapter_loaded() loads a chapter text, if neither the book nor the chapter is loaded yet.
+        The whole book is loaded instead, if the reader can't read a single chapter.
+        """
+
+        if book.is_loaded() or chapter_no in book.partial_chapters:
+            return
+
+        chapter = None
+        if hasattr(self.reader, "read_chapter"):
+            book_no = self.books.index(book)
+            chapter = self.reader.read_chapter(book, book_no, chapter_no)
+
+        if chapter is not None:
+            book.partial_chapters[chapter_no] = chapter
+        else:
+            self.ensure_loaded(book)
 
     def get_book_to_index_map(self):
         if self.book_to_index_map is None:
@@ -189,10 +215,17 @@ class Bible:
         book = self.books[bi]
         verses = []
 
-        if not book.is_loaded():
-            self.reader.read_book(book, bi)
+        # load only the chapters in range, if the reader supports it.
+        last_ct = ct1 if ct2 is None else ct2
+        for chapter_no in range(ct1, last_ct + 1):
+            self.ensure_chapter_loaded(book, chapter_no)
+
+        if book.is_loaded():
+            chapters = book.chapters
+        else:
+            chapters = [book.partial_chapters[no] for no in range(ct1, last_ct + 1)]
 
-        for c in book.chapters:
+        for c in chapters:
             if c.no < ct1:
                 continue
 
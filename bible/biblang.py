@@ -43,12 +43,29 @@ def check_bom(data: bytes) -> str:
     return None
 
 
-def detect_encoding(file):
+# Codecs that also remove the BOM while decoding.
+BOM_SKIPPING_CODECS = {
+    "utf-8": "utf-8-sig",
+    "utf-16-le": "utf-16",
+    "utf-16-be": "utf-16",
+    "utf-32-le": "utf-32",
+    "utf-32-be": "utf-32",
+}
+
+
+def detect_encoding(file, skip_bom=False):
+    """detect_encoding() returns the encoding based on the file's BOM, or None if there is no BOM.
+
+    If skip_bom is True, it returns the codec that removes the BOM while decoding.
+    """
     bom = None
     with open(file, "rb") as f:
         b = f.read(4)
         bom = check_bom(b)
 
+    if skip_bom and bom is not None:
+        bom = BOM_SKIPPING_CODECS[bom]
+
     return bom
 
 
@@ -207,9 +224,14 @@ class L18N:
         return short_name
 
     @staticmethod
-    def get_book_chapter_name(lang, book, chapter):
+    def get_book_chapter_format(lang):
+        """get_book_chapter_format() returns localized format string with {book} and {chapter} fields."""
         trans = L18N.get_translation(lang)
-        name = trans.gettext(L18N.BOOK_CHAPTER_FORMAT)
+        return trans.gettext(L18N.BOOK_CHAPTER_FORMAT)
+
+    @staticmethod
+    def get_book_chapter_name(lang, book, chapter):
+        name = L18N.get_book_chapter_format(lang)
         name = name.format(book=book, chapter=chapter)
         return name
 
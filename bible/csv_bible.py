@@ -5,9 +5,19 @@ import csv
 import os
 
 
+def _quote(field):
+    """Return field quoted in the same way as csv.writer does with the default dialect."""
+    if field is None:
+        return ""
+
+    if any(c in field for c in ',"\r\n'):
+        return '"' + field.replace('"', '""') + '"'
+
+    return field
+
+
 class CSVWriter:
-    def _get_extension(self):
-        return ".csv"
+    EXTENSION = ".csv"
 
     def write_bible(self, dirname, bible, encoding=None):
         if encoding and encoding.lower() == "utf-8":
@@ -20,20 +30,20 @@ class CSVWriter:
 
     def _write_books(self, booksname, bible, encoding=None):
         with open(booksname, "wt", newline="", encoding=encoding) as csvfile:
-            f = csv.writer(csvfile)
-            for i, b in enumerate(bible.books):
-                book_no = i + 1
-                old_new = "2" if b.new_testament else "1"
-                line = [str(book_no), old_new, b.name, b.short_name]
-                f.writerow(line)
+            # The books are few and simple, so write them at once without csv.writer.
+            lines = [
+                f"{i + 1},{2 if b.new_testament else 1},{_quote(b.name)},{_quote(b.short_name)}\r\n" for i, b in enumerate(bible.books)
+            ]
+            csvfile.write("".join(lines))
 
     def _write_verses(self, versesname, bible, encoding=None):
         with open(versesname, "wt", newline="", encoding=encoding) as csvfile:
             f = csv.writer(csvfile)
             for b, book in enumerate(bible.books):
-                bible.ensure_loaded(book)
+                if not book.is_loaded():
+                    bible.ensure_loaded(book)
 
                 for c, chapter in enumerate(book.chapters):
                     for _v, verse in enumerate(chapter.verses):
-                        line = [str(b + 1), str(c + 1), verse.no, verse.text]
+                        line = [b + 1, c + 1, verse.no, verse.text]
                         f.writerow(line)
@@ -1,5 +1,7 @@
 """
 """
+import importlib.util
+
 from .mybible import MyBibleFormat
 from .mysword_bible import MySwordFormat
 from .sword_bible import SwordFormat
@@ -12,30 +14,49 @@ FORMAT_SWORD = "Sword"
 FORMAT_ZEFANIA = "Zefania"
 
 
+def _create_sword_format():
+    from pysword.modules import SwordModules
+
+    modules = SwordModules()
+    try:
+        found_modules = modules.parse_modules()
+    except FileNotFoundError:
+        found_modules = {}
+
+    return SwordFormat(modules, found_modules)
+
+
 def _import_bible_format():
+    """Return the factory of each supported format.
+
+    The format object is created on the first use, as parsing Sword modules scans the file system.
+    """
     prog_dict = {}
 
-    prog_dict[FORMAT_MYBIBLE] = MyBibleFormat()
+    prog_dict[FORMAT_MYBIBLE] = MyBibleFormat
 
-    prog_dict[FORMAT_MYSWORD] = MySwordFormat()
+    prog_dict[FORMAT_MYSWORD] = MySwordFormat
 
-    try:
-        from pysword.modules import SwordModules
+    if importlib.util.find_spec("pysword") is not None:
+        prog_dict[FORMAT_SWORD] = _create_sword_format
 
-        modules = SwordModules()
-        found_modules = modules.parse_modules()
-        prog_dict[FORMAT_SWORD] = SwordFormat(modules, found_modules)
-    except ImportError:
-        pass
-    except FileNotFoundError:
-        pass
-
-    prog_dict[FORMAT_ZEFANIA] = ZefaniaFormat()
+    prog_dict[FORMAT_ZEFANIA] = ZefaniaFormat
 
     return prog_dict
 
 
 FORMAT_LIST = _import_bible_format()
+_FORMAT_OBJECTS = {}
+
+
+def _get_format(fileformat):
+    if fileformat not in _FORMAT_OBJECTS:
+        if fileformat not in FORMAT_LIST:
+            return None
+
+        _FORMAT_OBJECTS[fileformat] = FORMAT_LIST[fileformat]()
+
+    return _FORMAT_OBJECTS[fileformat]
 
 
 def get_format_list():
@@ -43,22 +64,22 @@ def get_format_list():
 
 
 def get_format_option(fileformat, key):
-    if fileformat in FORMAT_LIST:
-        format_obj = FORMAT_LIST[fileformat]
+    format_obj = _get_format(fileformat)
+    if format_obj is not None:
         return format_obj.get_option(key)
 
     return None
 
 
 def set_format_option(fileformat, key, value):
-    if fileformat in FORMAT_LIST:
-        format_obj = FORMAT_LIST[fileformat]
+    format_obj = _get_format(fileformat)
+    if format_obj is not None:
         format_obj.set_option(key, value)
 
 
 def enum_versions(fileformat):
-    if fileformat in FORMAT_LIST:
-        format_obj = FORMAT_LIST[fileformat]
+    format_obj = _get_format(fileformat)
+    if format_obj is not None:
         return format_obj.enum_versions()
 
     return None
@@ -66,27 +87,28 @@ def enum_versions(fileformat):
 
 def read_version(fileformat, version):
     bible = None
-    if fileformat in FORMAT_LIST:
-        format_obj = FORMAT_LIST[fileformat]
+    format_obj = _get_format(fileformat)
+    if format_obj is not None:
         bible = format_obj.read_version(version)
 
     return bible
 
 
+BIBLE_INFO = {
+    "ESV": {
+        "creator": "Crossway",
+        "description": "The English Standard Version (ESV) is an essentially literal translation of the Bible in contemporary English.",
+        "publisher": "Crossway",
+        "rights": "Crossway",
+    },
+    "개역개정": {
+        "creator": "재단법인 대한성서공회",
+        "description": "대한성서공회가 발표한 성경으로 개역한글판을 1998년에 개정한 한국어 성경",
+        "publisher": "재단법인 대한성서공회",
+        "rights": "재단법인 대한성서공회",
+    },
+}
+
+
 def get_bible_info(version):
-    info_dict = {
-        "ESV": {
-            "creator": "Crossway",
-            "description": "The English Standard Version (ESV) is an essentially literal translation of the Bible in contemporary English.",
-            "publisher": "Crossway",
-            "rights": "Crossway",
-        },
-        "개역개정": {
-            "creator": "재단법인 대한성서공회",
-            "description": "대한성서공회가 발표한 성경으로 개역한글판을 1998년에 개정한 한국어 성경",
-            "publisher": "재단법인 대한성서공회",
-            "rights": "재단법인 대한성서공회",
-        },
-    }
-
-    return info_dict.get(version, None)
+    return BIBLE_INFO.get(version, None)
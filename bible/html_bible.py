@@ -1,15 +1,21 @@
 """
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import html
 import os
 import re
 
 from bible import biblang
 
+# Characters replaced by html.escape(), used to skip escaping plain text.
+_NEEDS_ESCAPE = re.compile(r"[&<>\"']")
+
 
 class HTMLWriter:
 
+    EXTENSION = ".html"
+
     lang = biblang.LANG_EN
     charset = "utf-8"
 
@@ -17,20 +23,31 @@ class HTMLWriter:
         super().__init__()
         self.dynamic_page = dynamic_page
         self.process_bible_tags = process_bible_tags
-
-    def _get_extension(self):
-        return ".html"
+        self.bc_format = None  # escaped book and chapter format of lang
+        self.book_names = {}  # book name to escaped book name
 
     def write_bible(self, dirname, bible, encoding="utf-8"):
         self.lang = bible.lang
 
-        extension = self._get_extension()
-        for i, b in enumerate(bible.books):
-            bible.ensure_loaded(b)
+        # Escape the format and the book names once, as chapter numbers don't need escaping.
+        self.bc_format = html.escape(biblang.L18N.get_book_chapter_format(self.lang))
+        self.book_names = {b.name: html.escape(b.name) for b in bible.books}
+
+        # Load all books first as the reader may not be thread safe.
+        for b in bible.books:
+            if not b.is_loaded():
+                bible.ensure_loaded(b)
+
+        extension = self.EXTENSION
 
+        def write_book_file(i, book):
             filename = f"book{i+1}{extension}"
             with open(os.path.join(dirname, filename), "wt", encoding=encoding) as file:
-                self._write_book(file, b)
+                self._write_book(file, book)
+
+        # Each book is written to its own file, so they can be written in parallel.
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            list(executor.map(write_book_file, range(len(bible.books)), bible.books))
 
         filename = f"index{extension}"
         with open(os.path.join(dirname, filename), "wt", encoding=encoding) as file:
@@ -135,17 +152,20 @@ function load_book(bookno) {
 
         print(f' <table border="0" width="100%%" cellpadding="0" cellspacing="0">', file=file)
 
+        bc_format = self.bc_format
+        book_name = self.book_names[book.name]
+
         for i in range(0, len(book.chapters), 2):
             print(f"  <tr>", file=file)
 
             chapter = book.chapters[i]
-            bc_name = html.escape(biblang.L18N.get_book_chapter_name(self.lang, book.name, chapter.no))
+            bc_name = bc_format.format(book=book_name, chapter=chapter.no)
             url = f'<a href="#chapter{chapter.no}">{bc_name}</a>'
             print(f'   <td width="50%%">{url}</td>', file=file)
 
             if (i + 1) < len(book.chapters):
                 chapter = book.chapters[i + 1]
-                bc_name = html.escape(biblang.L18N.get_book_chapter_name(self.lang, book.name, chapter.no))
+                bc_name = bc_format.format(book=book_name, chapter=chapter.no)
                 url = f'<a href="#chapter{chapter.no}">{bc_name}</a>'
             else:
                 url = ""
@@ -158,13 +178,13 @@ function load_book(bookno) {
     def _write_chapter(self, file, book, chapter):
         self._write_chapter_begin(file, book, chapter)
 
-        for verse in chapter.verses:
-            self._write_verse(file, verse)
+        # Write all verses of the chapter at once instead of a write per verse.
+        file.write("".join([self._format_verse(verse) for verse in chapter.verses]))
 
         self._write_chapter_end(file, book, chapter)
 
     def _write_chapter_begin(self, file, book, chapter):
-        bc_name = html.escape(biblang.L18N.get_book_chapter_name(self.lang, book.name, chapter.no))
+        bc_name = self.bc_format.format(book=self.book_names[book.name], chapter=chapter.no)
         print(f'<h2 align="center"><a name="chapter{chapter.no}">{bc_name}</a></h2>', file=file)
 
     def _write_chapter_end(self, file, book, chapter):
@@ -195,17 +215,17 @@ function load_book(bookno) {
 
         return text
 
-    def _write_verse(self, file, verse):
+    def _format_verse(self, verse):
         text = verse.text
         if self.process_bible_tags:
             text = self._process_tags(text)
-        else:
-            text = html.escape(verse.text)
+        elif _NEEDS_ESCAPE.search(text) is not None:
+            text = html.escape(text)
 
         if verse.no:
-            print(f"<sup><font color=red>{verse.no}&nbsp;</font></sup>{text}<br>", file=file)
+            return f"<sup><font color=red>{verse.no}&nbsp;</font></sup>{text}<br>\n"
         else:
-            print(f"<font color=blue>{text}</font><br>", file=file)
+            return f"<font color=blue>{text}</font><br>\n"
 
     def _write_index(self, file, bible):
         """_write_index writes two column table for old and new testament."""
@@ -228,34 +248,31 @@ function load_book(bookno) {
         print(f'    <td width="50%%">{testament_name}</td>', file=file)
         print("  </tr>", file=file)
 
-        extension = self._get_extension()
+        extension = self.EXTENSION
 
         # assume old testament comes before new testament.
         old = [b for b in bible.books if b.new_testament == False]
         new = [b for b in bible.books if b.new_testament != False]
-        max_row = max(len(old), len(new))
-        for i in range(max_row):
-            print("  <tr>", file=file)
-
+        old_count = len(old)
+        new_count = len(new)
+        empty_cell = '    <td width="50%%"></td>'
+        for i in range(max(old_count, new_count)):
             # left column
-            if i < len(old):
-                index = i + 1
-                filename = f"book{index}{extension}"
+            if i < old_count:
+                filename = f"book{i + 1}{extension}"
                 bookname = html.escape(old[i].name)
-                print(f'    <td width="50%%"><a href="{filename}">{bookname}</a></td>', file=file)
+                left = f'    <td width="50%%"><a href="{filename}">{bookname}</a></td>'
             else:
-                print('    <td width="50%%"></td>', file=file)
+                left = empty_cell
 
-            if i < len(new):
-                index = len(old) + i + 1
-                filename = f"book{index}{extension}"
+            if i < new_count:
+                filename = f"book{old_count + i + 1}{extension}"
                 bookname = html.escape(new[i].name)
-
-                print(f'    <td width="50%%"><a href="{filename}">{bookname}</a></td>', file=file)
+                right = f'    <td width="50%%"><a href="{filename}">{bookname}</a></td>'
             else:
-                print('    <td width="50%%"></td>', file=file)
+                right = empty_cell
 
-            print("  </tr>", file=file)
+            print(f"  <tr>\n{left}\n{right}\n  </tr>", file=file)
 
         print("</table>", file=file)
 
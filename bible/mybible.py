@@ -20,12 +20,46 @@ CHAPTERS=[<OFFSET OF FILE FOR EACH CAPTER START>] *
 ] *
 """
 
+import codecs
+from concurrent.futures import ThreadPoolExecutor
+import locale
 import os
-import re
 
 from .bibcore import Verse, Chapter, Book, Bible, BibleInfo, FileFormat
 from . import biblang
 
+# Book files are read and written sequentially, so use a large buffer.
+_BUFFER_SIZE = 1 << 20
+
+# Codecs that write the BOM by themselves.
+_BOM_WRITING_CODECS = ("utf-8-sig", "utf-16", "utf-32")
+
+
+def _open_sequential(filename, encoding):
+    file = open(filename, encoding=encoding, buffering=_BUFFER_SIZE)
+    try:
+        os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    except (AttributeError, OSError):
+        # posix_fadvise() is not available on Windows and macOS, and it is only a hint.
+        pass
+
+    return file
+
+
+def _open_with_bom(filename, encoding):
+    """_open_with_bom() opens filename for writing and writes the BOM at the start of the file."""
+    if encoding is not None and codecs.lookup(encoding).name == "utf-8":
+        encoding = "utf-8-sig"
+
+    file = open(filename, "wt", encoding=encoding, buffering=_BUFFER_SIZE)
+    if encoding is not None and codecs.lookup(encoding).name in _BOM_WRITING_CODECS:
+        # Writing an empty string makes the codec write the BOM now, so that file.tell() counts it.
+        file.write("")
+    else:
+        file.write(biblang.UNICODE_BOM)
+
+    return file
+
 
 def expect_string(buf, expect):
     if buf.startswith(expect):
@@ -38,6 +72,8 @@ class MyBibleReader:
     def __init__(self):
         self.dirname = None
         self.remove_chars = None
+        self.remove_table = None  # str.translate() table deleting each char in remove_chars
+        self.chapter_offsets = []  # list of chapter start offsets in each book file
 
     def _get_extension(self):
         return ".txt"
@@ -47,118 +83,150 @@ class MyBibleReader:
 
         self.dirname = dirname
         self.remove_chars = remove_chars
+        self.remove_table = str.maketrans("", "", remove_chars) if remove_chars else None
+        self.chapter_offsets = []
 
         index_name = os.path.join(dirname, "index.txt")
         encoding = None
         try:
-            encoding = biblang.detect_encoding(index_name)
+            encoding = biblang.detect_encoding(index_name, skip_bom=True)
         except FileNotFoundError:
             return None
 
-        with open(index_name, encoding=encoding) as file:
-            line = file.readline()
-            if biblang.UNICODE_BOM == line[0]:
-                line = line[1:]
+        # index.txt is small, so read it at once and parse the lines.
+        with _open_sequential(index_name, encoding) as file:
+            lines = iter(file.read().split("\n"))
 
-            line = line.strip()
-            if "INDEX FILE" != line:
-                return None
+        line = next(lines, "")
+        line = line.strip()
+        if "INDEX FILE" != line:
+            return None
 
-            bible = Bible()
+        bible = Bible()
 
-            line = file.readline()
-            bible.name = expect_string(line, "NAME=")
-            if not bible.name:
-                return None
+        line = next(lines, "")
+        bible.name = expect_string(line, "NAME=")
+        if not bible.name:
+            return None
 
-            line = file.readline()
-            book_count = expect_string(line, "BOOKCOUNT=")
-            if not book_count:
-                return None
-            book_count = int(book_count)
+        line = next(lines, "")
+        book_count = expect_string(line, "BOOKCOUNT=")
+        if not book_count:
+            return None
+        book_count = int(book_count)
 
-            use_previous_line = False
-            line = file.readline()
-            lang = expect_string(line, "LANGUAGE=")
-            if not lang:
-                lang = biblang.LANG_EN
-                use_previous_line = True
+        use_previous_line = False
+        line = next(lines, "")
+        lang = expect_string(line, "LANGUAGE=")
+        if not lang:
+            lang = biblang.LANG_EN
+            use_previous_line = True
 
-            if not load_all:
-                bible.reader = self
+        if not load_all:
+            bible.reader = self
 
-            for b in range(book_count):
-                if use_previous_line:
-                    use_previous_line = False
-                else:
-                    line = file.readline()
-
-                book_name = expect_string(line, "BOOK=")
-                if not book_name:
-                    return None
-                book_names = book_name.split(",")
-
-                line = file.readline()
-                chapter_indices = expect_string(line, "CHAPTERS=")
-                if not chapter_indices:
-                    return None
-                chapter_indices = chapter_indices.split(" ")
-
-                book = Book()
-                book.new_testament = BibleInfo.is_new_testament(b)
-                book.name = book_names[0]
-                if len(book_names) >= 2:
-                    book.short_name = book_names[1]
-                else:
-                    book.short_name = biblang.L18N.get_short_book_name(b, lang=lang)
+        for b in range(book_count):
+            if use_previous_line:
+                use_previous_line = False
+            else:
+                line = next(lines, "")
+
+            book_name = expect_string(line, "BOOK=")
+            if not book_name:
+                return None
+            book_names = book_name.split(",")
+
+            line = next(lines, "")
+            chapter_indices = expect_string(line, "CHAPTERS=")
+            if not chapter_indices:
+                return None
+            chapter_indices = chapter_indices.split(" ")
+            try:
+                self.chapter_offsets.append([int(ind, 16) for ind in chapter_indices])
+            except ValueError:
+                self.chapter_offsets.append(None)
+
+            book = Book()
+            book.new_testament = BibleInfo.is_new_testament(b)
+            book.name = book_names[0]
+            if len(book_names) >= 2:
+                book.short_name = book_names[1]
+            else:
+                book.short_name = biblang.L18N.get_short_book_name(b, lang=lang)
 
-                bible.books.append(book)
+            bible.books.append(book)
 
-                if load_all:
-                    self.read_book(book, b)
+            if load_all:
+                self.read_book(book, b)
 
         bible.ensure_loaded(bible.books[0])
         bible.lang = biblang.detect_language(bible.books[0].chapters[0].verses[0].text)
 
         return bible
 
-    def read_book(self, book, book_no):
+    def _get_book_filename(self, book_no):
         extension = self._get_extension()
         bookname = f"book{book_no+1}{extension}"
-        book_filename = os.path.join(self.dirname, bookname)
-        encoding = biblang.detect_encoding(book_filename)
-        with open(book_filename, encoding=encoding) as bf:
+        return os.path.join(self.dirname, bookname)
+
+    def read_book(self, book, book_no):
+        book_filename = self._get_book_filename(book_no)
+        encoding = biblang.detect_encoding(book_filename, skip_bom=True)
+        with _open_sequential(book_filename, encoding) as bf:
             self._read_book_file(bf, book)
 
-    def _read_book_file(self, file, book):
-        re_numbers = re.compile(r"^(\d+)(\-\d+)?(.*)")
+    def read_chapter(self, book, book_no, chapter_no):
+        """read_chapter() reads only the given chapter by using the chapter offsets in index.txt.
+
+        It returns None if the chapter can't be located, so that the whole book can be read instead.
+        """
+        offsets = self.chapter_offsets[book_no] if book_no < len(self.chapter_offsets) else None
+        if not offsets or chapter_no < 1 or chapter_no > len(offsets):
+            return None
+
+        start = offsets[chapter_no - 1]
+
+        book_filename = self._get_book_filename(book_no)
+        # The BOM only needs to be removed when reading from the start of the file.
+        encoding = biblang.detect_encoding(book_filename, skip_bom=(start == 0))
+        if encoding is None:
+            encoding = locale.getpreferredencoding(False)
+
+        with open(book_filename, "rb") as bf:
+            bf.seek(start)
+            if chapter_no < len(offsets):
+                data = bf.read(offsets[chapter_no] - start)
+            else:
+                data = bf.read()
+
+        try:
+            text = data.decode(encoding)
+        except UnicodeDecodeError:
+            return None
+
+        # Translate the line endings like the universal newline mode does for read_book(),
+        # and split only at "\n", so that both read the same verses.
+        lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+
+        chapter = Chapter()
+        chapter.no = chapter_no
+        for line in lines:
+            line = line.strip()
+            if line:
+                chapter.verses.append(self._parse_verse(line))
+
+        return chapter
 
+    def _read_book_file(self, file, book):
         chapter = None
         c = 1
-        for i, line in enumerate(file):
-            if i == 0 and biblang.UNICODE_BOM == line[0]:
-                line = line[1:]
-
+        # Read the whole book at once; split("\n") keeps the same lines as iterating the file.
+        for line in file.read().split("\n"):
             line = line.strip()
             if not line:
                 chapter = None
                 continue
 
-            v1 = None
-            no = None
-            text = None
-            m = re_numbers.match(line)
-            if m:
-                v1 = m.group(1)
-                v2 = None
-                no = v1
-                if m.group(2):
-                    v2 = m.group(2)[1:]
-                    no = v1 + "-" + v2
-                text = m.group(3).strip()
-            else:
-                text = line
-
             if chapter is None:
                 chapter = Chapter()
                 chapter.no = c
@@ -166,13 +234,44 @@ class MyBibleReader:
 
                 c = c + 1
 
-            if self.remove_chars:
-                text = text.replace(self.remove_chars, "")
+            chapter.verses.append(self._parse_verse(line))
+
+    def _parse_verse(self, line):
+        """_parse_verse() parses "<verse number>[-<verse number>]<text>" line without using regex."""
+        no = None
+        text = None
+
+        # Most lines are "<verse number>[-<verse number>]<TAB><text>".
+        head, sep, tail = line.partition("\t")
+        v1, dash, v2 = head.partition("-")
+        if sep and v1.isdecimal() and (not dash or v2.isdecimal()):
+            no = head
+            text = tail.strip()
+        else:
+            # isdecimal() matches the same characters as regex's \d.
+            length = len(line)
+            end = 0
+            while end < length and line[end].isdecimal():
+                end += 1
+
+            if end > 0 and end + 1 < length and line[end] == "-" and line[end + 1].isdecimal():
+                end += 2
+                while end < length and line[end].isdecimal():
+                    end += 1
+
+            if end > 0:
+                no = line[:end]
+                text = line[end:].strip()
+            else:
+                text = line
+
+        if self.remove_table:
+            text = text.translate(self.remove_table)
 
-            verse = Verse()
-            verse.set_no(no)
-            verse.text = text
-            chapter.verses.append(verse)
+        verse = Verse()
+        verse.set_no(no)
+        verse.text = text
+        return verse
 
 
 class MyBibleWriter:
@@ -185,22 +284,24 @@ class MyBibleWriter:
     def write_bible(self, dirname, bible, encoding="utf-8"):
         extension = self._get_extension()
 
-        indices = []
-        for i, b in enumerate(bible.books):
+        # Load all books first as the reader may not be thread safe.
+        for b in bible.books:
             bible.ensure_loaded(b)
 
+        def write_book_file(i, book):
             filename = f"book{i+1}{extension}"
-            with open(os.path.join(dirname, filename), "wt", encoding=encoding) as file:
-                chapter_indices = self._write_book(file, b)
-                indices.append(chapter_indices)
+            with _open_with_bom(os.path.join(dirname, filename), encoding) as file:
+                return self._write_book(file, book)
+
+        # Each book is written to its own file, so they can be written in parallel.
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            indices = list(executor.map(write_book_file, range(len(bible.books)), bible.books))
 
         filename = f"index{extension}"
-        with open(os.path.join(dirname, filename), "wt", encoding=encoding) as file:
+        with _open_with_bom(os.path.join(dirname, filename), encoding) as file:
             self._write_index(file, bible, indices)
 
     def _write_index(self, file, bible, indices):
-
-        print(biblang.UNICODE_BOM, file=file, end="")
         print("INDEX FILE", file=file)
 
         print(f"NAME={bible.name}", file=file)
@@ -216,33 +317,28 @@ class MyBibleWriter:
             else:
                 print(f"BOOK={book.name}", file=file)
 
-            chapter_indices = indices[i]
-            string = ""
-            for ind in chapter_indices:
-                if string:
-                    string = string + " "
-                string = string + format(ind, "X")
-
+            string = " ".join([format(ind, "X") for ind in indices[i]])
             print(f"CHAPTERS={string}", file=file)
 
     def _write_book(self, file, book):
         chapter_indices = []
 
-        # BOM
-        print(biblang.UNICODE_BOM, file=file, end="")
-
         for chapter in book.chapters:
             chapter_indices.append(file.tell())
+
+            lines = []
             for verse in chapter.verses:
                 verse_no = verse.no
                 if not verse_no:
                     verse_no = ""
                 else:
                     verse_no = str(verse_no) + "\t"
-                print(f"{verse_no}{verse.text}", file=file)
+                lines.append(f"{verse_no}{verse.text}\n")
 
             # blank line between each chapter
-            print("\n", file=file)
+            lines.append("\n\n")
+
+            file.writelines(lines)
 
         return chapter_indices
 
@@ -267,10 +363,12 @@ class MyBibleFormat(FileFormat):
 
         versions = []
         try:
-            for d in os.listdir(dirname):
-                if os.path.isdir(os.path.join(dirname, d)):
-                    if os.path.exists(os.path.join(dirname, d, "index.txt")):
-                        versions.append(d)
+            # scandir() provides the file type without a separate stat() call.
+            with os.scandir(dirname) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        if os.path.exists(os.path.join(entry.path, "index.txt")):
+                            versions.append(entry.name)
         except FileNotFoundError:
             pass
 
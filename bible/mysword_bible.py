@@ -5,13 +5,26 @@ The module also can be downloaded by using "bgmysword" program that reads text f
 https://github.com/GreenRaccoon23/bgmysword
 """
 
+from contextlib import closing
+import itertools
 import os
+import pathlib
 import re
 import sqlite3
 
 from .bibcore import BibleInfo, Verse, Chapter, Book, Bible, FileFormat
 from . import biblang
 
+# <CI> is replaced with a space and the other formatting tags are removed.
+_RE_FORMAT_TAGS = re.compile("<(CI|CM|FI|Fi|FO|Fo|FR|Fr|FU|Fu|PF[0-7]|PI[0-7])>")
+# match non-greedy: https://docs.python.org/3/howto/regex.html#greedy-versus-non-greedy
+_RE_RF = re.compile("<RF>.*?<Rf>")
+_RE_TS = re.compile("<TS>.*?<Ts>")
+
+
+def _replace_format_tag(m):
+    return " " if m.group(1) == "CI" else ""
+
 
 class MySwordReader:
     def __init__(self):
@@ -51,15 +64,14 @@ class MySwordReader:
         self._parse_chapters(book, self.cursor, book_no)
 
     def _parse_chapters(self, book, cursor, book_no):
-        for chapter_no in range(self._get_chapter_count(cursor, book_no)):
+        # Fetch the whole book at once instead of a query per chapter.
+        cursor.execute("SELECT Chapter, Verse, Scripture FROM Bible WHERE Book=? ORDER BY Chapter, Verse;", (book_no + 1,))
+        for chapter_no, rows in itertools.groupby(cursor.fetchall(), key=lambda row: row[0]):
             chapter = Chapter()
-            chapter.no = chapter_no + 1
+            chapter.no = int(chapter_no)
             book.chapters.append(chapter)
 
-            cursor.execute(f"SELECT Verse, Scripture FROM Bible WHERE Book='{book_no+1}' and Chapter='{chapter.no}';")
-            verses = cursor.fetchall()
-            for v in verses:
-                v_text = v[1]
+            for _chapter_no, verse_no, v_text in rows:
                 # Treat 'Title Start' at the beginning as another verse.
                 if v_text.startswith("<TS>"):
                     index = v_text.index("<Ts>")
@@ -71,59 +83,32 @@ class MySwordReader:
                         v_text = v_text[index + 4 :]
 
                 verse = Verse()
-                verse.set_no(v[0])
+                verse.set_no(verse_no)
                 verse.text = self._cleanup_text(v_text)
                 chapter.verses.append(verse)
 
     def _cleanup_text(self, text):
-        if self.remove_tags:
-            text = re.sub("<CI>", " ", text)
-            text = re.sub("<(CM|FI|Fi|FO|Fo|FR|Fr|FU|Fu|PF[0-7]|PI[0-7])>", "", text)
-
-            # match non-greedy: https://docs.python.org/3/howto/regex.html#greedy-versus-non-greedy
-            text = re.sub("<RF>.*?<Rf>", "", text)
+        # Most verses have no tags, so check with a plain substring search before using regex.
+        if self.remove_tags and "<" in text:
+            if "<C" in text or "<F" in text or "<P" in text:
+                text = _RE_FORMAT_TAGS.sub(_replace_format_tag, text)
+            if "<RF>" in text:
+                text = _RE_RF.sub("", text)
             # Ignore 'Title Start' in the middle.
-            text = re.sub("<TS>.*?<Ts>", "", text)
+            if "<TS>" in text:
+                text = _RE_TS.sub("", text)
 
         text = text.strip()
 
         return text
 
-    def _has_book(self, cursor, book):
-        cursor.execute(f"SELECT Book FROM Bible WHERE Book='{book}' and Chapter='1' and Verse='1';")
-        rows = cursor.fetchall()
-        return len(rows) > 0
-
     def _get_book_count(self, cursor):
-        book_count = BibleInfo.get_book_count()
-        if self._has_book(cursor, book_count):
-            while True:
-                if not self._has_book(cursor, book_count + 1):
-                    return book_count
-                book_count += 1
-        else:
-            while True:
-                if self._has_book(cursor, book_count - 1):
-                    return book_count - 1
-                book_count -= 1
-
-    def _has_chapter(self, cursor, book, chapter):
-        cursor.execute(f"SELECT Chapter FROM Bible WHERE Book='{book+1}' and Chapter='{chapter}' and Verse='1';")
-        rows = cursor.fetchall()
-        return len(rows) > 0
-
-    def _get_chapter_count(self, cursor, book):
-        chapter_count = BibleInfo.get_chapter_count(book)
-        if self._has_chapter(cursor, book, chapter_count):
-            while True:
-                if not self._has_chapter(cursor, book, chapter_count + 1):
-                    return chapter_count
-                chapter_count += 1
-        else:
-            while True:
-                if self._has_chapter(cursor, book, chapter_count - 1):
-                    return chapter_count - 1
-                chapter_count -= 1
+        cursor.execute("SELECT MAX(Book) FROM Bible;")
+        row = cursor.fetchone()
+        if row is None or row[0] is None:
+            return 0
+
+        return int(row[0])
 
 
 class MySwordFormat(FileFormat):
@@ -131,6 +116,7 @@ class MySwordFormat(FileFormat):
         super().__init__()
 
         self.versions = None
+        self.bible_names = {}  # pathname to (mtime, bible name) tuple
         self.options = {"ROOT_DIR": "", "remove_bible_tags": None}
 
     def _get_root_dir(self):
@@ -149,45 +135,44 @@ class MySwordFormat(FileFormat):
         return biblename if it is a valid bible.
         """
         desc = None
-        with sqlite3.connect(filename) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            tables = cursor.fetchall()
-            count = 0
-            for t in tables:
-                if t[0] in ("Details", "Bible"):
-                    count = count + 1
-
-            if count != 2:
-                return None
-
-            cursor.execute("select Abbreviation from Details;")
-            rows = cursor.fetchall()
-
-            if len(rows) == 1 and len(rows[0]):
-                desc = rows[0][0]
+        uri = pathlib.Path(os.path.abspath(filename)).as_uri() + "?mode=ro"
+        try:
+            with closing(sqlite3.connect(uri, uri=True)) as conn:
+                cursor = conn.cursor()
+                # Both queries fail if the table doesn't exist, so sqlite_master doesn't need to be checked.
+                cursor.execute("SELECT Abbreviation FROM Details;")
+                rows = cursor.fetchall()
+                cursor.execute("SELECT 1 FROM Bible LIMIT 1;")
+
+                if len(rows) == 1 and len(rows[0]):
+                    desc = rows[0][0]
+        except sqlite3.DatabaseError:
+            return None
 
         return desc
 
-        @staticmethod
-        def _get_column_names(cursor, tablename):
-            """Return list of columns from "tablename".
-            0|column_name|varchar|0||0
-            """
-            cursor.execute(f"pragma table_info({tablename});")
-            columns = cursor.fetchall()
-            return [c[1] for c in columns]
-
     def enum_versions(self):
         dirname = self._get_root_dir()
 
         versions = {}
-        for f in os.listdir(dirname):
-            if os.path.isfile(os.path.join(dirname, f)):
-                pathname = os.path.join(dirname, f)
-                name = self._get_bible_name(pathname)
-                if name:
-                    versions[name] = pathname
+        bible_names = {}
+        # scandir() provides the file type without a separate stat() call.
+        with os.scandir(dirname) as it:
+            for entry in it:
+                if entry.is_file():
+                    # Reuse the name from the previous enum_versions() if the file is not modified.
+                    mtime = entry.stat().st_mtime
+                    cached = self.bible_names.get(entry.path)
+                    if cached is not None and cached[0] == mtime:
+                        name = cached[1]
+                    else:
+                        name = self._get_bible_name(entry.path)
+                    bible_names[entry.path] = (mtime, name)
+
+                    if name:
+                        versions[name] = entry.path
+
+        self.bible_names = bible_names
 
         self.versions = versions
 
@@ -202,6 +187,9 @@ class MySwordFormat(FileFormat):
 
         filename = self.versions[version]
         conn = sqlite3.connect(filename)
+        # The module is only read, so keep more pages in the cache (negative size is in KiB).
+        conn.execute("PRAGMA query_only=1;")
+        conn.execute("PRAGMA cache_size=-20000;")
 
         reader = MySwordReader()
         remove_tags = False
@@ -2,7 +2,12 @@
 """
 
 import os
-import xml.sax.saxutils
+
+# The whole bible is written sequentially into one file, so use a large buffer.
+_BUFFER_SIZE = 1 << 20
+
+# Same as xml.sax.saxutils.escape(), but in a single pass.
+_XML_ESCAPE_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
 
 
 class OpenSongXMLWriter:
@@ -14,27 +19,29 @@ class OpenSongXMLWriter:
             encoding = "utf-8"
 
         filename = os.path.join(dirname, "bible.xml")
-        with open(os.path.join(dirname, filename), "wt", encoding=encoding) as file:
+        with open(filename, "wt", encoding=encoding, buffering=_BUFFER_SIZE) as file:
             self._write_xml_header(file, encoding)
 
+            # Collect the whole bible into one list and write it at once.
+            lines = []
             for book in bible.books:
                 bible.ensure_loaded(book)
 
-                print(f' <b n="{book.name}">', file=file)
+                lines.append(f' <b n="{book.name}">\n')
 
                 for chapter in book.chapters:
-                    print(f'  <c n="{chapter.no}">', file=file)
-
-                    for verse in chapter.verses:
-                        verse_no = verse.no
-                        if verse_no is None:
-                            verse_no = ""
-                        text = xml.sax.saxutils.escape(verse.text)
-                        print(f'   <v n="{verse_no}">{text}</v>', file=file)
-
-                    print(f"  </c>", file=file)
-
-                print(f" </b>", file=file)
+                    lines.append(f'  <c n="{chapter.no}">\n')
+                    lines.extend(
+                        [
+                            f'   <v n="{"" if verse.no is None else verse.no}">{verse.text.translate(_XML_ESCAPE_TABLE)}</v>\n'
+                            for verse in chapter.verses
+                        ]
+                    )
+                    lines.append("  </c>\n")
+
+                lines.append(" </b>\n")
+
+            file.write("".join(lines))
 
             self._write_xml_footer(file)
 
@@ -1,4 +1,4 @@
-"""This file supports reading Sword Bible module by using Python sword_bible module.
+"""This file supports reading Sword Bible module by using Python pysword module.
 https://pypi.org/project/pysword/
 """
 
@@ -9,24 +9,28 @@ from . import biblang
 class SwordReader:
     def __init__(self):
         self.sw_bible = None
+        self.sw_books = None  # testament ("ot" or "nt") to list of pysword books
+        self.ot_len = 0
 
     def read_bible(self, sw_bible, version, load_all=False) -> Bible:
         bible = Bible()
         bible.name = version
-        book_no = 0
 
+        # get_books() builds the book structure on each call, so keep it for read_book().
+        sw_books = sw_bible.get_structure().get_books()
         if not load_all:
             self.sw_bible = sw_bible
+            self.sw_books = sw_books
+            self.ot_len = len(sw_books["ot"])
             bible.reader = self
 
-        for testament, books in sw_bible.get_structure().get_books().items():
+        for testament, books in sw_books.items():
             for sw_book in books:
                 book = Book()
                 book.new_testament = testament == "nt"
                 book.name = sw_book.name
                 book.short_name = sw_book.preferred_abbreviation
                 bible.books.append(book)
-                book_no = book_no + 1
 
                 if load_all:
                     self._parse_chapters(book, sw_bible, sw_book)
@@ -38,24 +42,28 @@ class SwordReader:
 
     def read_book(self, book, book_no):
         ot_nt = "nt" if book.new_testament else "ot"
-        sw_books = self.sw_bible.get_structure().get_books()[ot_nt]
+        sw_books = self.sw_books[ot_nt]
         if book.new_testament:
-            ot_len = len(self.sw_bible.get_structure().get_books()["ot"])
-            book_no = book_no - ot_len
+            book_no = book_no - self.ot_len
         self._parse_chapters(book, self.sw_bible, sw_books[book_no])
 
     def _parse_chapters(self, book, sw_bible, sw_book):
+        books = [book.name.lower()]
+        get_iter = sw_bible.get_iter
         for chapter_no in range(sw_book.num_chapters):
             chapter = Chapter()
             chapter.no = chapter_no + 1
             book.chapters.append(chapter)
 
-            verses = sw_bible.get_iter(books=[book.name.lower()], chapters=chapter_no + 1)
-            for i, v in enumerate(verses):
-                verse = Verse()
-                verse.set_no(i + 1)
-                verse.text = v
-                chapter.verses.append(verse)
+            verses = get_iter(books=books, chapters=chapter_no + 1)
+            chapter.verses = [self._make_verse(i + 1, v) for i, v in enumerate(verses)]
+
+    @staticmethod
+    def _make_verse(no, text):
+        verse = Verse()
+        verse.set_no(no)
+        verse.text = text
+        return verse
 
 
 class SwordFormat(FileFormat):
@@ -65,16 +73,12 @@ class SwordFormat(FileFormat):
         self.modules = modules
         self.found_modules = found_modules
         self.versions = None
+        self.version_set = None  # same as versions for O(1) lookup in read_version()
 
     def enum_versions(self):
         if self.versions is None:
-            versions = []
-            for m in self.found_modules:
-                if "blocktype" in self.found_modules[m]:
-                    if self.found_modules[m]["blocktype"] == "BOOK":
-                        versions.append(m)
-
-            self.versions = versions
+            self.versions = [m for m, info in self.found_modules.items() if info.get("blocktype") == "BOOK"]
+            self.version_set = frozenset(self.versions)
 
         return self.versions
 
@@ -82,7 +86,7 @@ class SwordFormat(FileFormat):
         if self.versions is None:
             self.enum_versions()
 
-        if version not in self.versions:
+        if version not in self.version_set:
             return None
 
         sw_bible = self.modules.get_bible_from_module(version)
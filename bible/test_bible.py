@@ -69,3 +69,51 @@ def test_extract_texts_from_bible_index(text_range, verse_count):
     bible_index = bible.translate_to_bible_index(text_range)
     verses = bible.extract_texts_from_bible_index(*bible_index)
     assert verse_count == len(verses), f"{verse_count}!={len(verses)} doesn't match!"
+
+
+class ChapterReader:
+    """ChapterReader reads chapters from b1 and counts the books read as a whole."""
+
+    def __init__(self):
+        self.book_read_count = 0
+
+    def read_book(self, book, _book_no):
+        self.book_read_count += 1
+        for c_no in b1:
+            book.chapters.append(self.read_chapter(book, 0, c_no))
+
+    def read_chapter(self, _book, _book_no, chapter_no):
+        if chapter_no not in b1:
+            return None
+
+        c = Chapter()
+        c.no = chapter_no
+        for v_no, v_text in b1[chapter_no].items():
+            v = Verse()
+            v.set_no(v_no)
+            v.text = v_text
+            c.verses.append(v)
+
+        return c
+
+
+@mark.parametrize("text_range,verse_count,book_read_count", [("Genesis 2:2-3", 2, 0), ("Genesis 1:3-2:1", 2, 0), ("Genesis 3:1", 0, 1)])
+def test_extract_texts_with_chapter_reader(text_range, verse_count, book_read_count):
+    bible = populate_bible()
+    bible.books[0].chapters = []
+    bible.reader = ChapterReader()
+    verses = bible.extract_texts(text_range) or []
+    assert verse_count == len(verses), f"{verse_count}!={len(verses)} doesn't match!"
+    assert book_read_count == bible.reader.book_read_count, f"{book_read_count}!={bible.reader.book_read_count} doesn't match!"
+
+
+def test_partial_chapters_dropped_after_book_loaded():
+    bible = populate_bible()
+    book = bible.books[0]
+    book.chapters = []
+    bible.reader = ChapterReader()
+    bible.extract_texts("Genesis 1:1")
+    assert 1 in book.partial_chapters, "Genesis 1 isn't read as a partial chapter!"
+    bible.extract_texts("Genesis 3:1")
+    assert 1 == bible.reader.book_read_count, f"1!={bible.reader.book_read_count} doesn't match!"
+    assert not book.partial_chapters, "partial chapters are kept after the book is loaded!"
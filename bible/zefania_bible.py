@@ -2,104 +2,245 @@
 The Bible texts can be downloaded frmo https://sourceforge.net/projects/zefania-sharp/files/Bibles/.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import json
 import os
 import xml.etree.ElementTree as ET
-import xml.sax.saxutils
+from xml.parsers import expat
 
 # pip install iso639-lang
 from iso639 import Lang
 
+# lxml is optional: pip install lxml
+try:
+    import lxml.etree as LET
+except ImportError:
+    LET = None
+
+from atomicfile import AtomicFileWriter
+
 from .bibcore import BibleInfo, Verse, Chapter, Book, Bible, FileFormat
 from . import biblang
 
+# The whole bible is written sequentially into one file, so use a large buffer.
+_BUFFER_SIZE = 1 << 20
+
+# Same as xml.sax.saxutils.escape(), but in a single pass.
+_XML_ESCAPE_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+# Attribute values are quoted with '"', so it needs to be escaped as well.
+_XML_ATTR_ESCAPE_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+# Bible names found by ZefaniaFormat.enum_versions() are cached in ROOT_DIR.
+_INDEX_FILENAME = ".zefania_index.json"
+
+
+class _StopParsing(Exception):
+    """Raised from the expat handler to stop parsing once the root tag is found."""
+
+
+class ZefaniaTarget:
+    """ZefaniaTarget is a lxml parser target that builds Bible directly from the parser events,
+    without creating an element for each node.
+
+    It only handles the same nodes as ZefaniaReader does with ElementTree.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.bible = Bible()
+        self.tags = []
+
+        self.chapter = None
+        self.verse = None
+        self.verse_texts = None  # stripped text fragments inside VERS
+        self.fragment = []  # data of the current text fragment inside VERS
+        self.lang_texts = None  # data inside the first INFORMATION/language
+
+    def start(self, tag, attrib):
+        depth = len(self.tags)
+        parent = self.tags[-1] if depth else None
+        self.tags.append(tag)
+
+        if self.verse_texts is not None:
+            self._flush_fragment()
+        elif depth == 0:
+            self.bible.name = attrib["biblename"]
+        elif depth == 1 and tag == "BIBLEBOOK":
+            book = self.reader._make_book(attrib, self.bible.lang)
+            self.bible.books.append(book)
+        elif depth == 2 and parent == "BIBLEBOOK" and tag == "CHAPTER":
+            self.chapter = Chapter()
+            self.chapter.no = int(attrib["cnumber"])
+            self.bible.books[-1].chapters.append(self.chapter)
+        elif depth == 3 and parent == "CHAPTER" and tag == "VERS" and self.chapter is not None:
+            self.verse = Verse()
+            self.verse.set_no(attrib["vnumber"])
+            self.chapter.verses.append(self.verse)
+            self.verse_texts = []
+        elif depth == 2 and parent == "INFORMATION" and tag == "language" and self.bible.lang is None:
+            self.lang_texts = []
+
+    def end(self, tag):
+        self.tags.pop()
+
+        if self.verse_texts is not None:
+            self._flush_fragment()
+            if len(self.tags) == 3 and tag == "VERS":
+                self.verse.text = " ".join(self.verse_texts)
+                self.verse_texts = None
+        elif self.lang_texts is not None and len(self.tags) == 2:
+            self.bible.lang = self.reader._parse_lang("".join(self.lang_texts))
+            self.lang_texts = None
+        elif len(self.tags) == 1 and tag == "BIBLEBOOK":
+            self.chapter = None
+
+    def data(self, data):
+        if self.verse_texts is not None:
+            self.fragment.append(data)
+        elif self.lang_texts is not None:
+            self.lang_texts.append(data)
+
+    def close(self):
+        return self.bible
+
+    def _flush_fragment(self):
+        """Same as each text from itertext(), a fragment ends at a start or end tag."""
+        t = "".join(self.fragment).strip()
+        if t:
+            self.verse_texts.append(t)
+        self.fragment = []
+
 
 class ZefaniaReader:
+    def __init__(self):
+        self.book_names_tables = {}  # lang to list of (name, short_name) for each book
+
     @staticmethod
-    def _get_bible_name(filename, hint_line=10):
+    def _get_bible_name(filename, hint_size=4096):
         """Check whether it is a XML file with following xml tag and attributes.
         <XMLBIBLE biblename="King James 2000" type="x-bible">
 
         return biblename if it is a valid bible.
         """
-        lines = ""
-        with open(filename, "r", encoding="utf-8") as f:
-            for i in range(hint_line):
-                lines += f.readline()
-
-        parser = ET.XMLPullParser(["start", "end"])
-        parser.feed(lines)
-        for event, elem in parser.read_events():
-            if event == "start" and elem.tag == "XMLBIBLE" and "biblename" in elem.attrib:
-                return elem.attrib["biblename"]
-
-            return None
+        root = []
+
+        def start_element(name, attrs):
+            root.append((name, attrs))
+            # Only the root tag is needed, so stop parsing at once.
+            raise _StopParsing()
+
+        parser = expat.ParserCreate()
+        parser.StartElementHandler = start_element
+        # The root tag is normally in the first block, so read more only for a long preamble.
+        # The bytes are fed as is, so the parser decodes them by the XML declaration.
+        with open(filename, "rb") as f:
+            try:
+                while data := f.read(hint_size):
+                    parser.Parse(data, False)
+            except _StopParsing:
+                name, attrs = root[0]
+                if name == "XMLBIBLE" and "biblename" in attrs:
+                    return attrs["biblename"]
+
+        return None
 
     def read_bible(self, filename):
-        tree = ET.parse(filename)
-        root = tree.getroot()
+        if LET is not None:
+            parser = LET.XMLParser(target=ZefaniaTarget(self), huge_tree=False)
+            return LET.parse(filename, parser)
+
+        # Parse incrementally and drop each book once it is converted,
+        # so that the whole XML tree is never kept in memory.
+        context = ET.iterparse(filename, events=("start", "end"))
+        _event, root = next(context)
 
         bible = Bible()
         bible.name = root.attrib["biblename"]
-        for node in root:
+        depth = 0
+        for event, node in context:
+            if event == "start":
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth != 0:
+                continue
+
             if node.tag == "INFORMATION":
                 lang_node = node.find("language")
                 if lang_node is not None:
-                    lang_part2 = lang_node.text.strip().lower()
-                    try:
-                        lang = Lang(part2b=lang_part2)
-                        bible.lang = lang.part1
-                    except KeyError:
-                        bible.lang = biblang.LANG_EN
+                    bible.lang = self._parse_lang(lang_node.text)
 
             elif node.tag == "BIBLEBOOK":
-                book = Book()
-                book_no = int(node.attrib["bnumber"])
-                book.new_testament = BibleInfo.is_new_testament(book_no - 1)
-                if "bname" in node.attrib:
-                    book.name = node.attrib["bname"]
-                if "bsname" in node.attrib:
-                    book.short_name = node.attrib["bsname"]
-                if not book.name or not book.short_name:
-                    names = biblang.L18N.get_book_names(book_no - 1, bible.lang)
-                    if not book.name:
-                        book.name = names[0]
-                    if not book.short_name:
-                        book.short_name = names[1]
+                book = self._make_book(node.attrib, bible.lang)
                 bible.books.append(book)
 
                 self._parse_chapters(book, node)
 
+            node.clear()
+            root.remove(node)
+
         return bible
 
+    @staticmethod
+    def _parse_lang(text):
+        lang_part2 = text.strip().lower()
+        try:
+            lang = Lang(part2b=lang_part2)
+            return lang.part1
+        except KeyError:
+            return biblang.LANG_EN
+
+    def _make_book(self, attrib, lang):
+        book = Book()
+        book_no = int(attrib["bnumber"])
+        book.new_testament = BibleInfo.is_new_testament(book_no - 1)
+        if "bname" in attrib:
+            book.name = attrib["bname"]
+        if "bsname" in attrib:
+            book.short_name = attrib["bsname"]
+        if not book.name or not book.short_name:
+            names = self._get_book_names_table(lang)[book_no - 1]
+            if not book.name:
+                book.name = names[0]
+            if not book.short_name:
+                book.short_name = names[1]
+
+        return book
+
+    def _get_book_names_table(self, lang):
+        """Localize all book names once per language instead of a lookup per book."""
+        table = self.book_names_tables.get(lang)
+        if table is None:
+            table = [biblang.L18N.get_book_names(i, lang) for i in range(BibleInfo.BOOK_COUNT)]
+            self.book_names_tables[lang] = table
+
+        return table
+
     def _parse_chapters(self, book, book_node):
-        for node in book_node:
-            if node.tag == "CHAPTER":
-                chapter = Chapter()
-                chapter.no = int(node.attrib["cnumber"])
-                book.chapters.append(chapter)
+        book.chapters = [self._make_chapter(node) for node in book_node if node.tag == "CHAPTER"]
+
+    def _make_chapter(self, node):
+        chapter = Chapter()
+        chapter.no = int(node.attrib["cnumber"])
 
-                self._parse_verses(chapter, node)
+        self._parse_verses(chapter, node)
+
+        return chapter
 
     def _parse_verses(self, chapter, chapter_node):
-        for node in chapter_node:
-            if node.tag == "VERS":
-                verse = Verse()
-                verse.set_no(node.attrib["vnumber"])
-                verse.text = self._concat_children_text(node)
-                chapter.verses.append(verse)
+        chapter.verses = [self._make_verse(node) for node in chapter_node if node.tag == "VERS"]
 
-    def _concat_children_text(self, node):
-        text = ""
-        for it in node.itertext():
-            t = it.strip()
-            if t:
-                if text:
-                    text = text + " " + t
-                else:
-                    text = t
+    def _make_verse(self, node):
+        verse = Verse()
+        verse.set_no(node.attrib["vnumber"])
+        verse.text = self._concat_children_text(node)
+
+        return verse
 
-        return text
+    def _concat_children_text(self, node):
+        return " ".join([t for it in node.itertext() if (t := it.strip())])
 
 
 class ZefaniaWriter:
@@ -116,7 +257,7 @@ class ZefaniaWriter:
             encoding = "utf-8"
 
         filename = f"bible{extension}"
-        with open(os.path.join(dirname, filename), "wt", encoding=encoding) as file:
+        with open(os.path.join(dirname, filename), "wt", encoding=encoding, buffering=_BUFFER_SIZE) as file:
             self._write_header(file, bible)
 
             self._write_info(file, bible)
@@ -129,6 +270,7 @@ class ZefaniaWriter:
             self._write_footer(file)
 
     def _write_header(self, file, bible):
+        bible_name = bible.name.translate(_XML_ATTR_ESCAPE_TABLE)
 
         print(
             f"""<?xml version="1.0" encoding="utf-8"?>
@@ -136,7 +278,7 @@ class ZefaniaWriter:
 <!--http://bgfdb.de/zefaniaxml/bml/-->
 <!--Download another Zefania XML files from-->
 <!--http://sourceforge.net/projects/zefania-sharp-->
-<XMLBIBLE xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="zef2005.xsd" version="2.0.1.18" revision="1" status="v" biblename="{bible.name}" type="x-bible">
+<XMLBIBLE xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="zef2005.xsd" version="2.0.1.18" revision="1" status="v" biblename="{bible_name}" type="x-bible">
 """,
             file=file,
             end="",
@@ -146,8 +288,8 @@ class ZefaniaWriter:
         from .fileformat import get_bible_info
 
         dt_str = datetime.today().strftime("%Y-%m-%d")
-        bible_name = xml.sax.saxutils.escape(bible.name)
-        bible_lang = xml.sax.saxutils.escape(bible.lang)
+        bible_name = bible.name.translate(_XML_ESCAPE_TABLE)
+        bible_lang = bible.lang.translate(_XML_ESCAPE_TABLE)
 
         creator = ""
         description = ""
@@ -186,13 +328,15 @@ class ZefaniaWriter:
         print(f"</XMLBIBLE>", file=file)
 
     def _write_book(self, file, nth, book):
-        long_name = xml.sax.saxutils.escape(book.name)
-        short_name = xml.sax.saxutils.escape(book.short_name)
+        long_name = book.name.translate(_XML_ATTR_ESCAPE_TABLE)
+        short_name = book.short_name.translate(_XML_ATTR_ESCAPE_TABLE)
         print(f""" <BIBLEBOOK bnumber="{nth+1}" bname="{long_name}" bsname="{short_name}">""", file=file)
 
+        escape_table = _XML_ESCAPE_TABLE
         for c, chapter in enumerate(book.chapters):
             print(f"""  <CHAPTER cnumber="{c+1}">""", file=file)
 
+            lines = []
             for verse in chapter.verses:
                 verse_no = verse.no
 
@@ -200,12 +344,17 @@ class ZefaniaWriter:
                 if verse_no is None:
                     continue
 
-                # Use the first verse no for range verse.
-                if isinstance(verse_no, str) and "-" in verse_no:
-                    verse_no = verse_no.split("-", maxsplit=1)[0]
-                verse_no = str(verse_no)
-                verse_text = xml.sax.saxutils.escape(verse.text)
-                print(f"""   <VERS vnumber="{verse_no}">{verse_text}</VERS>""", file=file)
+                if type(verse_no) is str:
+                    # Use the first verse no for range verse.
+                    if "-" in verse_no:
+                        verse_no = verse_no.split("-", maxsplit=1)[0]
+                else:
+                    verse_no = str(verse_no)
+                verse_text = verse.text.translate(escape_table)
+                lines.append('   <VERS vnumber="' + verse_no + '">' + verse_text + "</VERS>\n")
+
+            # Write the verses of the chapter at once instead of a write per verse.
+            file.write("".join(lines))
 
             print(f"  </CHAPTER>", file=file)
 
@@ -228,16 +377,66 @@ class ZefaniaFormat(FileFormat):
 
         return dirname
 
+    @staticmethod
+    def _load_index(index_filename):
+        """_load_index() returns the cached bible names as {filename: [mtime, size, bible name]}.
+
+        An index that can't be read or parsed is treated as empty, so the bible names are read again.
+        """
+        try:
+            with open(index_filename, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        return index if isinstance(index, dict) else {}
+
+    @staticmethod
+    def _save_index(index_filename, index):
+        # Serialize first, so that the atomic write only replaces the index with a complete one.
+        data = json.dumps(index, ensure_ascii=False)
+        try:
+            with AtomicFileWriter(index_filename, "w", encoding="utf-8") as f:
+                f.write(data)
+        except OSError:
+            # The cache is only an optimization, so ROOT_DIR may be read only.
+            pass
+
     def enum_versions(self):
         dirname = self._get_root_dir()
 
+        # scandir() provides the file type without a separate stat() call.
+        with os.scandir(dirname) as it:
+            entries = [entry for entry in it if entry.is_file() and entry.name.lower().endswith(".xml")]
+
+        # Reuse the bible names of the files that are not modified since the last enum_versions().
+        index_filename = os.path.join(dirname, _INDEX_FILENAME)
+        old_index = self._load_index(index_filename)
+        index = {}
+        pending = []
+        for entry in entries:
+            st = entry.stat()
+            cached = old_index.get(entry.name)
+            if isinstance(cached, list) and len(cached) == 3 and cached[0] == st.st_mtime and cached[1] == st.st_size:
+                index[entry.name] = cached
+            else:
+                index[entry.name] = [st.st_mtime, st.st_size, None]
+                pending.append(entry)
+
+        # Reading the header of each file is I/O bound, so read them in parallel.
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            names = executor.map(ZefaniaReader._get_bible_name, [entry.path for entry in pending])
+            for entry, name in zip(pending, names):
+                index[entry.name][2] = name
+
+        if index != old_index:
+            self._save_index(index_filename, index)
+
         versions = {}
-        for f in os.listdir(dirname):
-            if os.path.isfile(os.path.join(dirname, f)):
-                pathname = os.path.join(dirname, f)
-                name = ZefaniaReader._get_bible_name(pathname)
-                if name:
-                    versions[name] = pathname
+        for entry in entries:
+            name = index[entry.name][2]
+            if name:
+                versions[name] = entry.path
 
         self.versions = versions
 
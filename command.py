@@ -1,10 +1,15 @@
 """
 """
+from concurrent.futures import ThreadPoolExecutor
 import datetime
 import errno
+import functools
+import hashlib
+import itertools
 import locale
 import math
 import os
+import pickle
 import re
 import shutil
 import sys
@@ -15,6 +20,7 @@ import zipfile
 
 from PIL import ImageColor
 
+from atomicfile import AtomicFileWriter
 from bible import bibcore
 from bible import biblang
 from bible import fileformat as bibfileformat
@@ -94,6 +100,19 @@ def get_contiguous_ranges(r):
     yield [start, end]
 
 
+# Joins slide texts to scan them at once. It is not expected in any slide text.
+_TEXT_SEPARATOR = "\x1e"
+
+
+def _iter_texts(var):
+    """_iter_texts() yields all the strings in the nested lists of strings."""
+    if isinstance(var, list):
+        for elem in var:
+            yield from _iter_texts(elem)
+    elif isinstance(var, str):
+        yield var
+
+
 def replace_all_notes_text(notes, text_dict):
     count = 0
     for from_text, to_text in text_dict.items():
@@ -337,6 +356,7 @@ class SaveFiles(Command):
                 cm.error_message(_("Cannot save bible verses to the file '{filename}'.").format(filename=verses_filename))
 
     def create_zip_lyric_files(self, zipfilename, files):
+        written_files = set()
         with zipfile.ZipFile(zipfilename, "w", zipfile.ZIP_DEFLATED) as zipf:
             for file in files:
                 if isinstance(file, dict):
@@ -344,7 +364,9 @@ class SaveFiles(Command):
                     key = song.title
                     xml_content = file["xml_content"]
                     zipf.writestr(key, xml_content)
-                else:
+                elif file not in written_files:
+                    # A repeated song is stored once.
+                    written_files.add(file)
                     zipf.write(file, os.path.basename(file))
 
     def create_osz_lyric_files(self, cm, zipfilename, filelist):
@@ -569,18 +591,17 @@ class FormatObj(object):
     def build_format_pattern(varnames):
         varname_pattern = ""
         if isinstance(varnames, str) and str:
-            varname_pattern = r"\{(" + re.escape(varnames) + r")(" + FormatObj.VAR_FORMAT_SEP + "[^\}]+)?" + r"\}"
+            varname_pattern = r"\{(" + re.escape(varnames) + r")(" + FormatObj.VAR_FORMAT_SEP + r"[^\}]+)?" + r"\}"
         else:
             try:
-                for var in varnames:
-                    if varname_pattern:
-                        varname_pattern = varname_pattern + "|"
-                    varname_pattern = varname_pattern + re.escape(var)
+                # Join once instead of growing the pattern string for each variable.
+                # Leading empty names don't add an alternative, and an escaped name never starts with "|".
+                varname_pattern = "|".join([re.escape(var) for var in varnames]).lstrip("|")
             except TypeError as e:
                 print(varnames + " is not iterable.")
 
             if varname_pattern:
-                varname_pattern = r"\{(" + varname_pattern + r")(" + FormatObj.VAR_FORMAT_SEP + "[^\}]+)?" + r"\}"
+                varname_pattern = r"\{(" + varname_pattern + r")(" + FormatObj.VAR_FORMAT_SEP + r"[^\}]+)?" + r"\}"
 
         return varname_pattern
 
@@ -588,6 +609,19 @@ class FormatObj(object):
         return self.format == other.format and self.value == other.value
 
 
+@functools.lru_cache(maxsize=128)
+def _compile_format_pattern(varnames):
+    """_compile_format_pattern() returns the compiled FormatObj.build_format_pattern(varnames) or None.
+
+    varnames is a str or a tuple of str, so that the same pattern is built and compiled only once.
+    """
+    varname_pattern = FormatObj.build_format_pattern(varnames)
+    if not varname_pattern:
+        return None
+
+    return re.compile(varname_pattern)
+
+
 class BibleVerseFormat(FormatObj):
     def __init__(self, format: str = "", value: str = ""):
         super().__init__(format, value)
@@ -599,8 +633,7 @@ class BibleVerseFormat(FormatObj):
     def build_fr_dict(slide_text: typing.Any, verses: typing.Dict[str, bibcore.Verse]):
         fr_dict = {}
         for each_verse_name, verse in verses.items():
-            varname_pattern = FormatObj.build_format_pattern(each_verse_name)
-            varname_re = re.compile(varname_pattern)
+            varname_re = _compile_format_pattern(each_verse_name)
 
             def process_format_var(var: typing.Any):
                 if isinstance(var, list):
@@ -1148,11 +1181,7 @@ class ExportSlides(Command):
         if (self.flags & Export_Transparent) and self.image_type == "png" and self.color:
             cm.progress_message(50, _("Converting to transparent images."))
 
-            color = ImageColor.getrgb(self.color)
-            for index in slide_range:
-                f = cm.get_filename_from_slideno(self.image_type, index)
-                filename = os.path.join(self.out_dirname, f)
-                color_to_transparent(filename, filename, color)
+            self.convert_to_transparent(cm, self.out_dirname, slide_range)
 
     def export_all(self, cm, prs):
         src_dirname = cm.generate_image_files(self.image_type, self.color)
@@ -1162,18 +1191,29 @@ class ExportSlides(Command):
         if slide_range is None:
             return
 
+        slidenos = range(slide_range[0], slide_range[1] + 1)
         if (self.flags & Export_Transparent) and self.image_type == "png" and self.color:
             cm.progress_message(50, _("Converting to transparent images."))
 
-            color = ImageColor.getrgb(self.color)
-            for index in range(slide_range[0], slide_range[1] + 1):
-                f = cm.get_filename_from_slideno(self.image_type, index)
-                filename = os.path.join(src_dirname, f)
-                color_to_transparent(filename, filename, color)
+            self.convert_to_transparent(cm, src_dirname, slidenos)
+
+        filenames = [os.path.join(src_dirname, cm.get_filename_from_slideno(self.image_type, index)) for index in slidenos]
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            list(executor.map(shutil.copy, filenames, itertools.repeat(self.out_dirname)))
+
+    def convert_to_transparent(self, cm, dirname, slidenos):
+        """convert_to_transparent() converts the exported images in parallel.
+
+        PowerPoint exports the slides one by one, but each image can be converted on its own.
+        """
+        color = ImageColor.getrgb(self.color)
+        filenames = [os.path.join(dirname, cm.get_filename_from_slideno(self.image_type, index)) for index in slidenos]
 
-        for index in range(slide_range[0], slide_range[1] + 1):
-            f = cm.get_filename_from_slideno(self.image_type, index)
-            shutil.copy(os.path.join(src_dirname, f), self.out_dirname)
+        def convert(filename):
+            color_to_transparent(filename, filename, color)
+
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            list(executor.map(convert, filenames))
 
 
 class ExportShapes(Command):
@@ -1199,10 +1239,27 @@ class ExportShapes(Command):
         prs.export_slide_shapes_as(slide_range, self.out_dirname, self.image_type)
 
 
+def _get_cache_dir():
+    """_get_cache_dir() returns the per user cache directory of this program."""
+    if sys.platform.startswith("win32"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+
+    return os.path.join(base, "service_ppt")
+
+
+# OpenLyricsReader is stateless, so all LyricManagers share the same reader.
+_LYRICS_READER = OpenLyricsReader()
+
+
 class LyricManager:
     def __init__(self, cm):
         self.cm = cm
-        self.reader = OpenLyricsReader()
+        self.reader = _LYRICS_READER
+        self.song_cache_dir = os.path.join(_get_cache_dir(), "songs")
         self.lyric_file_map = {}
         self.all_lyric_files = []
         self.lyric_search_path = None
@@ -1215,12 +1272,22 @@ class LyricManager:
         if filename in self.lyric_file_map:
             return self.lyric_file_map[filename]
 
-        if not os.path.exists(filename):
+        return self._read_song_known(filename, os.path.exists(filename))
+
+    def _read_song_known(self, filename, exists, future=None):
+        """_read_song_known() reads the song when the caller already checked whether the file exists.
+
+        future is the result of self._parse_song(filename) if it is already submitted to an executor.
+        """
+        if not exists:
             self.cm.error_message(_("Cannot open a lyric file '{filename}'.").format(filename=filename))
             raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
 
         try:
-            song = self.reader.read_song(filename)
+            if future is not None:
+                song = future.result()
+            else:
+                song = self._parse_song(filename)
         except Exception as e:
             self.cm.error_message(_("Cannot open a lyric file '{filename}'.").format(filename=filename))
             raise
@@ -1229,41 +1296,100 @@ class LyricManager:
         return song
 
     def read_songs(self, filelist):
-        songs = []
-        for filename in filelist:
-            song = self.read_song(filename)
-            songs.append(song)
+        pending = [filename for filename in dict.fromkeys(filelist) if filename not in self.lyric_file_map]
+        exists = [os.path.exists(filename) for filename in pending]
+
+        # Read the files in parallel, but handle the results in order on this thread,
+        # so that errors are reported as before and lyric_file_map is only updated here.
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            futures = [executor.submit(self._parse_song, filename) if e else None for filename, e in zip(pending, exists)]
+            for filename, e, future in zip(pending, exists, futures):
+                self._read_song_known(filename, e, future)
 
+        songs = [self.lyric_file_map[filename] for filename in filelist]
         return songs
 
+    def _parse_song(self, filename):
+        """_parse_song() reads the song from the disk cache if the file is not modified since it is cached.
+
+        Each file has a single cache entry named by its path, which keeps the (mtime, size) of the file with the song,
+        so a modified file overwrites its own entry.
+        It only touches the files, so it can be called from worker threads.
+        """
+        cache_filename = None
+        stamp = None
+        try:
+            st = os.stat(filename)
+            stamp = (st.st_mtime_ns, st.st_size)
+            path_hash = hashlib.sha1(os.path.abspath(filename).encode("utf-8")).hexdigest()
+            cache_filename = os.path.join(self.song_cache_dir, path_hash + ".pkl")
+            with open(cache_filename, "rb") as f:
+                cached = pickle.load(f)
+            if isinstance(cached, tuple) and len(cached) == 2 and cached[0] == stamp:
+                return cached[1]
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # Missing or broken cache including the one from an old Song class, so read the file.
+            pass
+
+        song = self.reader.read_song(filename)
+
+        if cache_filename:
+            try:
+                os.makedirs(self.song_cache_dir, exist_ok=True)
+                with AtomicFileWriter(cache_filename, "wb") as f:
+                    pickle.dump((stamp, song), f, protocol=pickle.HIGHEST_PROTOCOL)
+            except (OSError, pickle.PicklingError):
+                pass
+
+        return song
+
     def search_lyric_file(self, filename: str) -> typing.Optional[str]:
-        _dir, fn = os.path.split(filename)
         xml_pathname = os.path.splitext(filename)[0] + ".xml"
-        file_exist = os.path.exists(xml_pathname)
-        if file_exist:
+        if os.path.exists(xml_pathname):
             return xml_pathname
 
         # seach xml file from search path
         if self.lyric_search_path:
-            xml_filename = os.path.splitext(fn)[0] + ".xml"
+            xml_filename = os.path.basename(xml_pathname)
             searched_xml_pathname = os.path.join(self.lyric_search_path, xml_filename)
-            file_exist = os.path.exists(searched_xml_pathname)
-            if file_exist:
+            if os.path.exists(searched_xml_pathname):
                 return searched_xml_pathname
 
         return xml_pathname
 
     def add_lyric_file(self, filelist):
+        # all_lyric_files keeps the repeated songs for the service order,
+        # but a song already in lyric_file_map doesn't need to be read again.
         if isinstance(filelist, list):
-            _songs = self.read_songs(filelist)
+            to_read = [filename for filename in filelist if filename not in self.lyric_file_map]
+            if to_read:
+                self.read_songs(to_read)
             self.all_lyric_files.extend(filelist)
         elif isinstance(filelist, dict):
             self.all_lyric_files.append(filelist)
         else:
-            song = self.read_song(filelist)
+            if filelist not in self.lyric_file_map:
+                self.read_song(filelist)
             self.all_lyric_files.append(filelist)
 
 
+# Removes the slide image caches in background, created by _get_cache_remover() when a cache is first removed.
+# concurrent.futures waits for the pending removals when the process exits.
+_cache_remover = None
+
+
+def _get_cache_remover():
+    global _cache_remover
+    if _cache_remover is None:
+        _cache_remover = ThreadPoolExecutor(max_workers=2)
+
+    return _cache_remover
+
+
+# Set SERVICE_PPT_TRACE=1 to print the traceback of the errors while running the commands.
+_TRACE_ERRORS = os.environ.get("SERVICE_PPT_TRACE") == "1"
+
+
 class CommandManager:
     def __init__(self):
         self.running_already = False
@@ -1272,6 +1398,7 @@ class CommandManager:
 
         self.string_variables = {}
         self.format_variables = {}
+        self.string_var_dict = {}  # string_variables with the braced variable names
         self.var_dict = {}
         self.varname_re = None
 
@@ -1280,8 +1407,9 @@ class CommandManager:
         self.monitor = None
         self._continue = True
 
-        self.image_dir = {}
+        self.image_dir = {}  # image_type to TemporaryDirectory
         self.num_digits = 0
+        self.slide_filename_format = "Slide%d.%s"
 
         self.bible_verse = None
 
@@ -1309,6 +1437,7 @@ class CommandManager:
 
         self.string_variables = {}
         self.format_variables = {}
+        self.string_var_dict = {}  # string_variables with the braced variable names
         self.var_dict = {}
         self.varname_re = None
 
@@ -1324,48 +1453,64 @@ class CommandManager:
 
     def add_global_variables(self, str_dict, format_dict=None):
         self.string_variables.update(str_dict)
-        if format_dict:
-            self.format_variables.update(format_dict)
 
-        self.var_dict = {}
-        for var in self.string_variables:
-            new_var = var
-            if new_var[0] != "{":
-                new_var = "{" + new_var
-            if new_var[-1] != "}":
-                new_var = new_var + "}"
+        # Only wrap the new variable names with braces unless they already have them.
+        self.string_var_dict.update(
+            {
+                ("" if var.startswith("{") else "{") + var + ("" if var.endswith("}") else "}"): value
+                for var, value in str_dict.items()
+                if var
+            }
+        )
+        # Drop the values of the format variables built so far, they are built again with the new variables.
+        self.var_dict = self.string_var_dict.copy()
 
-            self.var_dict[new_var] = self.string_variables[var]
-
-        varname_pattern = ""
-        self.varname_re = None
-        if len(self.format_variables):
-            varnames = self.format_variables.keys()
-            varname_pattern = FormatObj.build_format_pattern(varnames)
-            if varname_pattern:
-                self.varname_re = re.compile(varname_pattern)
+        if format_dict:
+            self.format_variables.update(format_dict)
+            self.varname_re = _compile_format_pattern(tuple(self.format_variables.keys()))
 
     def process_format_var(self, var):
         if isinstance(var, list):
-            for elem in var:
-                self.process_format_var(elem)
+            # Scan all the distinct texts at once instead of a regex call per text.
+            texts = [text for text in dict.fromkeys(_iter_texts(var)) if text not in self.var_dict]
+            if any(_TEXT_SEPARATOR in text for text in texts):
+                for text in texts:
+                    self._process_format_text(text)
+            else:
+                self._process_format_text(_TEXT_SEPARATOR.join(texts), _TEXT_SEPARATOR)
         elif isinstance(var, str):
             if var in self.var_dict:
                 return
 
-            for m in self.varname_re.finditer(var):
-                varname = m.group(1)
-                if varname not in self.format_variables:
+            self._process_format_text(var)
+
+    def _process_format_text(self, text, separator=None):
+        """_process_format_text() adds the format variables in text to var_dict.
+
+        If separator is given, text is joined texts and a match across the separator is ignored.
+        """
+        pos = 0
+        while (m := self.varname_re.search(text, pos)) is not None:
+            if separator is not None:
+                index = text.find(separator, m.start(), m.end())
+                if index != -1:
+                    # There is no match in the rest of the text before the separator.
+                    pos = index + len(separator)
                     continue
+            pos = m.end()
 
-                format_obj = self.format_variables[varname]
+            varname = m.group(1)
+            if varname not in self.format_variables:
+                continue
 
-                format = m.group(2)
-                if len(format):
-                    format = format[1:]  # remove FormatObj.VAR_FORMAT_SEP
-                key = "{" + varname + m.group(2) + "}"
-                value = format_obj.build_replace_string(format)
-                self.var_dict[key] = value
+            format_obj = self.format_variables[varname]
+
+            format = m.group(2)
+            if len(format):
+                format = format[1:]  # remove FormatObj.VAR_FORMAT_SEP
+            key = "{" + varname + m.group(2) + "}"
+            value = format_obj.build_replace_string(format)
+            self.var_dict[key] = value
 
     def replace_format_vars(self, custom_str):
         if self.varname_re:
@@ -1373,15 +1518,27 @@ class CommandManager:
         _, custom_str = replace_all_notes_text(custom_str, self.var_dict)
         return custom_str
 
+    def get_used_var_dict(self, texts):
+        """get_used_var_dict() returns the items of var_dict whose variable is in texts or in any value,
+        as a value can contain another variable that will be replaced later.
+        """
+        all_text = _TEXT_SEPARATOR.join(itertools.chain(_iter_texts(texts), self.var_dict.values()))
+        return {var: value for var, value in self.var_dict.items() if var in all_text}
+
     def process_variable_substitution(self):
-        if self.varname_re:
-            self.process_format_var(self.prs.get_text_in_all_slides(False))
-        self.prs.replace_all_slides_texts(self.var_dict)
+        # Walking every shape of the slides is expensive, so skip it when there is nothing to replace.
+        if self.varname_re or self.var_dict:
+            slide_texts = self.prs.get_text_in_all_slides(False)
+            if self.varname_re:
+                self.process_format_var(slide_texts)
+
+            # Each variable is replaced by PowerPoint, so only pass the variables in the slides or notes pages.
+            var_dict = self.get_used_var_dict([slide_texts, self.prs.get_text_in_all_slides(True)])
+            if var_dict:
+                self.prs.replace_all_slides_texts(var_dict)
 
         if self.notes:
-            if self.varname_re:
-                self.process_format_var(self.notes)
-            _, self.notes = replace_all_notes_text(self.notes, self.var_dict)
+            self.notes = self.replace_format_vars(self.notes)
 
     def get_notes(self):
         return self.notes
@@ -1407,15 +1564,33 @@ class CommandManager:
         self._continue = self.monitor.progress_message(progress, message)
 
     def error_message(self, message):
+        """error_message() also accepts an exception, whose traceback is printed only if SERVICE_PPT_TRACE=1 is set."""
+        if isinstance(message, BaseException):
+            if _TRACE_ERRORS:
+                traceback.print_exception(type(message), message, message.__traceback__)
+            message = str(message)
+
         self.monitor.error_message(message)
 
     # slide image file caching functions.
     def remove_cache(self):
-        for _, dirname in self.image_dir.items():
-            shutil.rmtree(dirname)
+        """remove_cache() removes the slide image directories in background."""
+        temp_dirs = list(self.image_dir.values())
         self.image_dir = {}
+        if not temp_dirs:
+            return
 
-    def normalize_image_type(self, image_type):
+        cache_remover = _get_cache_remover()
+        for temp_dir in temp_dirs:
+            try:
+                cache_remover.submit(temp_dir.cleanup)
+            except RuntimeError:
+                # The executor doesn't accept new work while the interpreter is shutting down.
+                temp_dir.cleanup()
+
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def normalize_image_type(image_type):
         image_type = image_type.lower()
         if image_type == "jpeg":
             image_type = "jpg"
@@ -1426,31 +1601,34 @@ class CommandManager:
     def generate_image_files(self, image_type, color=None):
         if self.prs:
             slide_count = self.prs.slide_count()
-            self.num_digits = len(f"{slide_count+1}")
+            self.set_num_digits(len(f"{slide_count+1}"))
         else:
-            self.num_digits = 0
+            self.set_num_digits(0)
 
         image_type = self.normalize_image_type(image_type)
 
         if image_type not in self.image_dir:
-            outdir = tempfile.mkdtemp(prefix="slides")
+            temp_dir = tempfile.TemporaryDirectory(prefix="slides")
+            outdir = temp_dir.name
 
             self.prs.saveas_format(outdir, image_type)
 
             rename_filename_to_zeropadded(outdir, self.num_digits)
 
-            self.image_dir[image_type] = outdir
+            self.image_dir[image_type] = temp_dir
 
-        return self.image_dir[image_type]
+        return self.image_dir[image_type].name
 
-    def get_filename_from_slideno(self, image_type, slideno):
-        image_type = self.normalize_image_type(image_type)
+    def set_num_digits(self, num_digits):
+        if num_digits == self.num_digits:
+            return
 
-        num = slideno + 1
-        fmt = r"%0" + str(self.num_digits) + r"d"
-        filename = "Slide" + (fmt % num) + "." + image_type
+        self.num_digits = num_digits
+        # The slide filename format only changes with num_digits, so build it once.
+        self.slide_filename_format = "Slide%0" + str(num_digits) + "d.%s"
 
-        return filename
+    def get_filename_from_slideno(self, image_type, slideno):
+        return self.slide_filename_format % (slideno + 1, self.normalize_image_type(image_type))
 
     def execute_commands(self, instructions, monitor):
         """execute_commands() is the main function calling each command's execute()
@@ -1467,19 +1645,23 @@ class CommandManager:
 
         self.prs = None
         count = len(instructions)
+        # Bind the methods used in each iteration once.
+        set_subrange = monitor.set_subrange
+        error_message = self.error_message
         for i, bi in enumerate(instructions):
+            # _continue is updated by progress_message() while executing the commands.
             if not self._continue:
                 break
 
             if not bi.enabled:
                 continue
 
-            monitor.set_subrange(i * 100 / count, (i + 1) * 100 / count)
+            set_subrange(i * 100 / count, (i + 1) * 100 / count)
             try:
+                # self.prs can be changed by the previous command.
                 bi.execute(self, self.prs)
             except Exception as e:
-                traceback.print_exc()
-                self.error_message(str(e))
+                error_message(e)
 
         self.progress_message(100, _("Cleaning up after running all the commands."))
         self.close()
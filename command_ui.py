@@ -2,7 +2,8 @@
 """
 
 import copy
-from io import StringIO
+import functools
+import itertools
 import json
 import re
 
@@ -32,70 +33,58 @@ def set_translation(trans):
     cmd.set_translation(trans)
 
 
-class StringBuilder:
-    _file_str = None
+# A blank line separates the texts, even with spaces in it or with CRLF line endings.
+_BLANK_LINE_RE = re.compile(r"\r?\n\s*\r?\n")
 
-    def __init__(self):
-        self._file_str = StringIO()
+# Escaped characters that don't unescape to themselves.
+_ESCAPE_MAP = {"n": "\n", "r": "\r"}
+# A backslash at the end of the text has nothing to escape and is removed.
+_UNESCAPE_RE = re.compile(r"\\(.?)", re.DOTALL)
 
-    def __str__(self):
-        return self._file_str.getvalue()
 
-    def append(self, str):
-        self._file_str.write(str)
+def _unescape_char(m):
+    return _ESCAPE_MAP.get(m.group(1), m.group(1))
 
 
 def unescape_backslash(s):
     """unescape_backslash() unescapes \ x into x for wxpg.LongStringProperty."""
-    sb = StringBuilder()
-    escape = False
-    for i in range(len(s)):
-        ch = s[i]
-        if escape:
-            if ch == "n":
-                ch = "\n"
-            elif ch == "r":
-                ch = "\r"
-            escape = False
-            sb.append(ch)
-        elif ch == "\\":
-            escape = True
-        else:
-            escape = False
-            sb.append(ch)
+    # Most texts have no backslash at all, so skip the regex scan for them.
+    if "\\" not in s:
+        return s
 
-    result = str(sb)
-    return result
+    return _UNESCAPE_RE.sub(_unescape_char, s)
 
 
 def escape_backslash(s):
     """escape_backslash() escapes x into \ x for wxpg.LongStringProperty."""
-    sb = StringBuilder()
-    escape = False
-    for i in range(len(s)):
-        ch = s[i]
-        if ch == "\\":
-            sb.append("\\\\")
-        else:
-            sb.append(ch)
+    return s.replace("\\", "\\\\")
+
 
-    result = str(sb)
-    return result
+@functools.lru_cache(maxsize=256)
+def _format_label(label_format, no):
+    """_format_label() formats the numbered label of a dynamic property once for each number."""
+    return label_format % no
 
 
 class MyFileProperty(wxpg.FileProperty):
     """Derived class to handle event when filename is changed by user."""
 
     ignore_open_file = False
+    main_frame = None  # mainframe.Frame set by itself, so the top level windows don't need to be searched.
 
     def OnSetValue(self):
         if self.ignore_open_file:
             return
 
-        tlws = wx.GetTopLevelWindows()
-        if len(tlws) > 0 and isinstance(tlws[0], wx.Frame):
+        frame = self.main_frame
+        if frame is None:
+            tlws = wx.GetTopLevelWindows()
+            if len(tlws) > 0:
+                frame = tlws[0]
+
+        if isinstance(frame, wx.Frame):
             # call mainframe.Frame.open_lyric_file()
-            tlws[0].open_lyric_file(self.m_value)
+            frame.open_lyric_file(self.m_value)
 
 
 class CommandUI(wx.EvtHandler):
@@ -174,27 +163,26 @@ class CommandUI(wx.EvtHandler):
 
     def set_modified(self, a, b):
         """set_modified() calls set_modified if different and return the latter."""
-        if a != b:
+        if a is not b and a != b:
             self.uimgr.set_modified()
         return b
 
     @staticmethod
-    def create_openfile_property(prop_name, wildcard):
+    def create_file_property(prop_name, wildcard, dialog_style):
         file_prop = wxpg.FileProperty(prop_name)
         # PG_DIALOG_TITLE
-        file_prop.SetAttribute(wxpg.PG_FILE_DIALOG_STYLE, wx.FD_OPEN | wx.FD_FILE_MUST_EXIST)
+        file_prop.SetAttribute(wxpg.PG_FILE_DIALOG_STYLE, dialog_style)
         file_prop.SetAttribute(wxpg.PG_FILE_WILDCARD, wildcard)
 
         return file_prop
 
     @staticmethod
-    def create_savefile_property(prop_name, wildcard):
-        file_prop = wxpg.FileProperty(prop_name)
-        # PG_DIALOG_TITLE
-        file_prop.SetAttribute(wxpg.PG_FILE_DIALOG_STYLE, wx.FD_SAVE)
-        file_prop.SetAttribute(wxpg.PG_FILE_WILDCARD, wildcard)
+    def create_openfile_property(prop_name, wildcard):
+        return CommandUI.create_file_property(prop_name, wildcard, wx.FD_OPEN | wx.FD_FILE_MUST_EXIST)
 
-        return file_prop
+    @staticmethod
+    def create_savefile_property(prop_name, wildcard):
+        return CommandUI.create_file_property(prop_name, wildcard, wx.FD_SAVE)
 
     @staticmethod
     def create_datetime_property(prop_name):
@@ -248,13 +236,16 @@ class PopupMessageUI(CommandUI):
 class PropertyGridUI(CommandUI):
     TIMER_ID = 100
 
+    # (command attribute, property label) pairs transferred as strings by TransferFromWindow() and TransferToWindow().
+    STRING_FIELDS = ()
+
     def __init__(self, uimgr, name, proc=None):
         super().__init__(uimgr, name, proc=proc)
 
         self.dynamic_count = 0
 
-        self.timer = wx.Timer(self, self.TIMER_ID)
-        self.Bind(wx.EVT_TIMER, self.on_timer)
+        # Most of the commands never extend the dynamic properties, so the timer is created on demand.
+        self.timer = None
 
     def construct_toplevel_ui(self, parent):
         # Difference between using PropertyGridManager vs PropertyGrid is that
@@ -265,9 +256,14 @@ class PropertyGridUI(CommandUI):
         # Show help as tooltips
         prop_grid.SetExtraStyle(wxpg.PG_EX_HELP_AS_TOOLTIPS)
 
-        self.initialize_fixed_properties(prop_grid)
+        # Lay out and paint the grid once after all the properties are appended.
+        prop_grid.Freeze()
+        try:
+            self.initialize_fixed_properties(prop_grid)
 
-        self.initialize_dynamic_properties(prop_grid)
+            self.initialize_dynamic_properties(prop_grid)
+        finally:
+            prop_grid.Thaw()
 
         return prop_grid
 
@@ -277,6 +273,24 @@ class PropertyGridUI(CommandUI):
     def initialize_dynamic_properties(self, pg):
         pass
 
+    def TransferFromWindow(self):
+        get_value = self.ui.GetPropertyValueAsString
+        self.apply_changes([(attr, get_value(label)) for attr, label in self.STRING_FIELDS])
+        return True
+
+    def TransferToWindow(self):
+        for attr, label in self.STRING_FIELDS:
+            self.SetPropertyValueString(label, getattr(self.command, attr))
+        return True
+
+    def apply_changes(self, pairs):
+        """apply_changes() sets the changed (command attribute, value) pairs and calls set_modified once if any."""
+        command = self.command
+        changes = {attr: value for attr, value in pairs if getattr(command, attr) != value}
+        if changes:
+            vars(command).update(changes)
+            self.uimgr.set_modified()
+
     def post_activate_ui(self):
         self.ui.Bind(wxpg.EVT_PG_CHANGED, self.on_property_changed, self.ui)
 
@@ -290,43 +304,63 @@ class PropertyGridUI(CommandUI):
         return None
 
     def get_dynamic_properties_from_window(self):
-        plist = []
-        i = 0
-        while True:
-            name = self.get_dynamic_label(i)
-            if self.ui.GetProperty(name) is None:
-                break
-            plist.append(self.ui.GetPropertyValueAsString(name))
-            i += 1
+        # dynamic_count is synced with the window by set_dynamic_properties_to_window() in TransferToWindow(),
+        # so the properties don't need to be probed one by one.
+        get_label = self.get_dynamic_label
+        get_value = self.ui.GetPropertyValueAsString
+        plist = [get_value(get_label(i)) for i in range(self.dynamic_count)]
 
-        while len(plist) and not plist[-1]:
-            del plist[-1]
+        # Drop the trailing empty properties with one slice.
+        end = len(plist)
+        while end and not plist[end - 1]:
+            end -= 1
 
-        return plist
+        return plist[:end]
 
     def set_dynamic_properties_to_window(self, plist):
-        for i in range(len(plist) + 1):
-            name = self.get_dynamic_label(i)
-            if self.ui.GetProperty(name) is None:
+        # Repaint the grid once after all the properties are updated.
+        self.ui.Freeze()
+        try:
+            self._set_dynamic_properties_to_window(plist, 1)
+        finally:
+            self.ui.Thaw()
+
+    def _set_dynamic_properties_to_window(self, plist, empty_count):
+        """_set_dynamic_properties_to_window() sets plist followed by empty_count empty properties
+        and removes the rest of the dynamic properties.
+        """
+        get_label = self.get_dynamic_label
+        get_property = self.ui.GetProperty
+        set_value = self.SetPropertyValueString
+        count = len(plist)
+
+        # The window is shared by all the commands of the same class,
+        # so probe the properties left by the previous command instead of using dynamic_count.
+        for i in range(count + empty_count):
+            name = get_label(i)
+            if get_property(name) is None:
                 self.ui.Append(self.get_dynamic_property(i))
 
-            self.ui.SetPropertyValueString(name, plist[i] if i < len(plist) else "")
+            set_value(name, plist[i] if i < count else "")
 
-        i = len(plist) + 1
+        remove_property = self.ui.RemoveProperty
+        i = count + empty_count
         while True:
-            name = self.get_dynamic_label(i)
-            if self.ui.GetProperty(name) is None:
+            name = get_label(i)
+            if get_property(name) is None:
                 break
 
-            self.ui.RemoveProperty(name)
+            remove_property(name)
             i += 1
 
-        self.dynamic_count = len(plist) + 1
+        self.dynamic_count = count + empty_count
 
     def SetPropertyValueString(self, name, value):
         if value is None:
             value = ""
-        self.ui.SetPropertyValueString(name, value)
+        # Setting the same value only refreshes the property, so skip it.
+        if self.ui.GetPropertyValueAsString(name) != value:
+            self.ui.SetPropertyValueString(name, value)
 
     def on_property_changed(self, event):
         name = event.GetPropertyName()
@@ -337,10 +371,19 @@ class PropertyGridUI(CommandUI):
             # create new entry.
             # But, creating new entry here, causes recursion somehow,
             # so, do it in timer callback.
-            self.timer.StartOnce(100)
+            self.get_timer().StartOnce(100)
+
+    def get_timer(self):
+        if self.timer is None:
+            self.timer = wx.Timer(self, self.TIMER_ID)
+            self.Bind(wx.EVT_TIMER, self.on_timer)
+
+        return self.timer
 
     def on_timer(self, _event):
-        self.ui.Append(self.get_dynamic_property(self.dynamic_count))
+        # A late timer can find the property already appended, e.g. left in the shared window by another command.
+        if self.ui.GetProperty(self.get_dynamic_label(self.dynamic_count)) is None:
+            self.ui.Append(self.get_dynamic_property(self.dynamic_count))
         self.dynamic_count = self.dynamic_count + 1
 
 
@@ -350,6 +393,11 @@ class OpenFileUI(PropertyGridUI):
     PRESENTATION_FILE = _("Presentation file")
     NOTES_FILE = _("Notes file")
 
+    STRING_FIELDS = (
+        ("filename", PRESENTATION_FILE),
+        ("notes_filename", NOTES_FILE),
+    )
+
     def __init__(self, uimgr, name, proc=None):
         super().__init__(uimgr, name, proc=proc)
 
@@ -366,22 +414,6 @@ class OpenFileUI(PropertyGridUI):
         file_prop = self.create_openfile_property(self.NOTES_FILE, _("Text files (*.txt)|*.txt"))
         pg.Append(file_prop)
 
-    def TransferFromWindow(self):
-        self.command.filename = self.set_modified(
-            self.command.filename,
-            self.ui.GetPropertyValueAsString(self.PRESENTATION_FILE),
-        )
-        self.command.notes_filename = self.set_modified(
-            self.command.notes_filename,
-            self.ui.GetPropertyValueAsString(self.NOTES_FILE),
-        )
-        return True
-
-    def TransferToWindow(self):
-        self.ui.SetPropertyValueString(self.PRESENTATION_FILE, self.command.filename)
-        self.ui.SetPropertyValueString(self.NOTES_FILE, self.command.notes_filename)
-        return True
-
 
 class SaveFilesUI(PropertyGridUI):
     proc_class = cmd.SaveFiles
@@ -391,6 +423,13 @@ class SaveFilesUI(PropertyGridUI):
     NOTES_FILE = _("Notes file")
     VERSES_FILE = _("Verses file")
 
+    STRING_FIELDS = (
+        ("filename", PRESENTATION_FILE),
+        ("lyrics_archive_filename", LYRICS_ARCHIVE_FILE),
+        ("notes_filename", NOTES_FILE),
+        ("verses_filename", VERSES_FILE),
+    )
+
     def __init__(self, uimgr, name, proc=None):
         super().__init__(uimgr, name, proc=proc)
 
@@ -413,32 +452,6 @@ class SaveFilesUI(PropertyGridUI):
         file_prop = self.create_savefile_property(self.VERSES_FILE, _("Text files (*.txt)|*.txt"))
         pg.Append(file_prop)
 
-    def TransferFromWindow(self):
-        self.command.filename = self.set_modified(
-            self.command.filename,
-            self.ui.GetPropertyValueAsString(self.PRESENTATION_FILE),
-        )
-        self.command.lyrics_archive_filename = self.set_modified(
-            self.command.lyrics_archive_filename,
-            self.ui.GetPropertyValueAsString(self.LYRICS_ARCHIVE_FILE),
-        )
-        self.command.notes_filename = self.set_modified(
-            self.command.notes_filename,
-            self.ui.GetPropertyValueAsString(self.NOTES_FILE),
-        )
-        self.command.verses_filename = self.set_modified(
-            self.command.verses_filename,
-            self.ui.GetPropertyValueAsString(self.VERSES_FILE),
-        )
-        return True
-
-    def TransferToWindow(self):
-        self.ui.SetPropertyValueString(self.PRESENTATION_FILE, self.command.filename)
-        self.ui.SetPropertyValueString(self.LYRICS_ARCHIVE_FILE, self.command.lyrics_archive_filename)
-        self.ui.SetPropertyValueString(self.NOTES_FILE, self.command.notes_filename)
-        self.ui.SetPropertyValueString(self.VERSES_FILE, self.command.verses_filename)
-        return True
-
 
 class SetVariablesUI(PropertyGridUI):
     proc_class = cmd.SetVariables
@@ -455,10 +468,9 @@ class SetVariablesUI(PropertyGridUI):
             self.command = cmd.SetVariables()
 
     def get_dynamic_label(self, index):
-        if (index % 2) == 0:
-            return self.VARNAME_D % (index / 2 + 1)
-        else:
-            return self.VARVALUE_D % (index / 2 + 1)
+        # Each variable has a name property followed by a value property.
+        pair, is_value = divmod(index, 2)
+        return _format_label(self.VARVALUE_D if is_value else self.VARNAME_D, pair + 1)
 
     def get_dynamic_property(self, index):
         return wxpg.StringProperty(self.get_dynamic_label(index))
@@ -479,38 +491,21 @@ class SetVariablesUI(PropertyGridUI):
         self.dynamic_count = 2
 
     def get_dynamic_properties_from_window(self):
-        plist = []
-        i = 0
-        while True:
-            name = self.get_dynamic_label(i)
-            if self.ui.GetProperty(name) is None:
-                break
-            plist.append(self.ui.GetPropertyValueAsString(name))
-            i += 1
+        get_label = self.get_dynamic_label
+        get_value = self.ui.GetPropertyValueAsString
+        plist = [get_value(get_label(i)) for i in range(self.dynamic_count)]
 
         if len(plist) > 2 and not plist[-2] and not plist[-1]:
-            del plist[-2]
-            del plist[-1]
+            del plist[-2:]
         return plist
 
     def set_dynamic_properties_to_window(self, plist):
-        for i in range(len(plist) + 2):
-            name = self.get_dynamic_label(i)
-            if self.ui.GetProperty(name) is None:
-                self.ui.Append(self.get_dynamic_property(i))
-
-            self.ui.SetPropertyValueString(name, plist[i] if i < len(plist) else "")
-
-        i = len(plist) + 2
-        while True:
-            name = self.get_dynamic_label(i)
-            if self.ui.GetProperty(name) is None:
-                break
-
-            self.ui.RemoveProperty(name)
-            i += 1
-
-        self.dynamic_count = len(plist) + 2
+        # Keep an empty name and value pair at the end.
+        self.ui.Freeze()
+        try:
+            self._set_dynamic_properties_to_window(plist, 2)
+        finally:
+            self.ui.Thaw()
 
     def TransferFromWindow(self):
         format_dict = {}
@@ -526,17 +521,11 @@ class SetVariablesUI(PropertyGridUI):
             # format comes from find_string
             format_dict[name] = cmd.DateTimeFormat(value=dt_str)
 
-        self.command.format_dict = self.set_modified(self.command.format_dict, format_dict)
-
         plist = self.get_dynamic_properties_from_window()
-        texts = {}
-        for i in range(0, len(plist), 2):
-            f = plist[i]
-            r = plist[i + 1]
-            if f:
-                texts[f] = r
+        # plist is the list of name and value pairs.
+        texts = {f: r for f, r in zip(plist[0::2], plist[1::2]) if f}
 
-        self.command.str_dict = self.set_modified(self.command.str_dict, texts)
+        self.apply_changes([("format_dict", format_dict), ("str_dict", texts)])
 
         return True
 
@@ -549,10 +538,7 @@ class SetVariablesUI(PropertyGridUI):
             dt_value = cmd.DateTimeFormat.datetime_from_c_locale(fobj.value)
             self.ui.SetPropertyValue(self.DATETIME_VALUE, dt_value)
 
-        plist = []
-        for k, v in self.command.str_dict.items():
-            plist.append(k)
-            plist.append(v)
+        plist = list(itertools.chain.from_iterable(self.command.str_dict.items()))
 
         self.set_dynamic_properties_to_window(plist)
 
@@ -584,7 +570,7 @@ class InsertSlidesUI(PropertyGridUI):
             self.command = cmd.InsertSlides(None, None, [])
 
     def get_dynamic_label(self, index):
-        return self.FILE_D % (index + 1)
+        return _format_label(self.FILE_D, index + 1)
 
     def get_dynamic_property(self, index):
         return self.create_openfile_property(self.get_dynamic_label(index), POWERPOINT_FILES_WILDCARD)
@@ -601,17 +587,15 @@ class InsertSlidesUI(PropertyGridUI):
         self.dynamic_count = 1
 
     def TransferFromWindow(self):
-        self.command.insert_location = self.set_modified(
-            self.command.insert_location,
-            self.ui.GetPropertyValueAsString(self.INSERT_LOCATION),
-        )
-        self.command.separator_slides = self.set_modified(
-            self.command.separator_slides,
-            self.ui.GetPropertyValueAsString(self.SEPARATOR_SLIDES),
+        get_value = self.ui.GetPropertyValueAsString
+        self.apply_changes(
+            [
+                ("insert_location", get_value(self.INSERT_LOCATION)),
+                ("separator_slides", get_value(self.SEPARATOR_SLIDES)),
+                ("filelist", self.get_dynamic_properties_from_window()),
+            ]
         )
 
-        self.command.filelist = self.set_modified(self.command.filelist, self.get_dynamic_properties_from_window())
-
         return True
 
     def TransferToWindow(self):
@@ -662,7 +646,7 @@ class InsertLyricsUI(PropertyGridUI):
         return file_prop
 
     def get_dynamic_label(self, index):
-        return self.FILE_D % (index + 1)
+        return _format_label(self.FILE_D, index + 1)
 
     def get_dynamic_property(self, index):
         return self.create_openfile_property(self.get_dynamic_label(index), self.LYRIC_FILES_WILDCARD)
@@ -691,35 +675,19 @@ class InsertLyricsUI(PropertyGridUI):
         MyFileProperty.ignore_open_file = True
 
         index = self.ui.GetPropertyValueAsInt(self.FILE_TYPE)
-        self.command.flags = self.set_modified(self.command.flags, index + 1)
-
-        self.command.slide_insert_location = self.set_modified(
-            self.command.slide_insert_location,
-            self.ui.GetPropertyValueAsString(self.SLIDE_REPEAT_RANGE),
-        )
-        self.command.slide_separator_slides = self.set_modified(
-            self.command.slide_separator_slides,
-            self.ui.GetPropertyValueAsString(self.SLIDE_SEPARATOR_SLIDES),
-        )
-
-        self.command.lyric_insert_location = self.set_modified(
-            self.command.lyric_insert_location,
-            self.ui.GetPropertyValueAsString(self.LYRIC_REPEAT_RANGE),
-        )
-        self.command.lyric_separator_slides = self.set_modified(
-            self.command.lyric_separator_slides,
-            self.ui.GetPropertyValueAsString(self.LYRIC_SEPARATOR_SLIDES),
-        )
-        self.command.lyric_pattern = self.set_modified(
-            self.command.lyric_pattern,
-            self.ui.GetPropertyValueAsString(self.LYRIC_PATTERN),
+        get_value = self.ui.GetPropertyValueAsString
+        self.apply_changes(
+            [
+                ("flags", index + 1),
+                ("slide_insert_location", get_value(self.SLIDE_REPEAT_RANGE)),
+                ("slide_separator_slides", get_value(self.SLIDE_SEPARATOR_SLIDES)),
+                ("lyric_insert_location", get_value(self.LYRIC_REPEAT_RANGE)),
+                ("lyric_separator_slides", get_value(self.LYRIC_SEPARATOR_SLIDES)),
+                ("lyric_pattern", get_value(self.LYRIC_PATTERN)),
+                ("archive_lyric_file", self.ui.GetPropertyValueAsBool(self.ARCHIVE_LYRIC_FILES)),
+                ("filelist", self.get_dynamic_properties_from_window()),
+            ]
         )
-        self.command.archive_lyric_file = self.set_modified(
-            self.command.archive_lyric_file,
-            self.ui.GetPropertyValueAsBool(self.ARCHIVE_LYRIC_FILES),
-        )
-
-        self.command.filelist = self.set_modified(self.command.filelist, self.get_dynamic_properties_from_window())
 
         MyFileProperty.ignore_open_file = False
 
@@ -789,47 +757,38 @@ class DuplicateWithTextUI(PropertyGridUI):
         pg.Append(wxpg.IntProperty(self.PAGE_WITDH))
 
     def TransferFromWindow(self):
-        self.command.slide_range = self.set_modified(self.command.slide_range, self.ui.GetPropertyValueAsString(self.SLIDE_RANGE))
-        self.command.repeat_range = self.set_modified(
-            self.command.repeat_range,
-            self.ui.GetPropertyValueAsString(self.REPEAT_RANGE),
-        )
+        get_value = self.ui.GetPropertyValueAsString
+        # find_text is kept out of apply_changes(), so changing only it doesn't mark the service modified.
+        self.command.find_text = get_value(self.FIND_TEXT)
 
-        self.command.find_text = self.ui.GetPropertyValueAsString(self.FIND_TEXT)
-        text = self.ui.GetPropertyValueAsString(self.REPLACE_TEXT)
+        text = get_value(self.REPLACE_TEXT)
         text = unescape_backslash(text)
-        lines = re.split(r"(\n){2}", text)
-        lines = [l.strip() for l in lines if l.strip()]
-        self.command.replace_texts = self.set_modified(self.command.replace_texts, lines)
+        # Texts are separated by a blank line, strip each text once and drop the empty ones.
+        lines = [l for l in (part.strip() for part in _BLANK_LINE_RE.split(text)) if l]
 
-        text = self.ui.GetPropertyValueAsString(self.PREPROCESS_SCRIPT)
-        text = unescape_backslash(text)
-        self.command.preprocessing_script = self.set_modified(self.command.preprocessing_script, text)
+        text = get_value(self.PREPROCESS_SCRIPT)
+        preprocessing_script = unescape_backslash(text)
 
-        self.command.archive_lyric_file = self.set_modified(
-            self.command.archive_lyric_file,
-            self.ui.GetPropertyValueAsBool(self.ARCHIVE_LYRIC_FILES),
-        )
-        optional_line_break = self.ui.GetPropertyValueAsString(self.OPTION_SPLIT_LINE_AT_EVERY)
+        optional_line_break = get_value(self.OPTION_SPLIT_LINE_AT_EVERY)
         optional_line_break = int(optional_line_break) if optional_line_break.isdigit() else 0
-        self.command.optional_line_break = self.set_modified(self.command.optional_line_break, optional_line_break)
-
-        self.command.enable_wordwrap = self.set_modified(
-            self.command.enable_wordwrap,
-            self.ui.GetPropertyValueAsBool(self.ENABLE_WORDWRAP),
-        )
 
         font_property = self.ui.GetPropertyByLabel(self.WORDWRAP_FONT)
         font_obj = font_property.GetValue()
         wordwrap_font = font_obj.GetNativeFontInfoDesc()
-        self.command.wordwrap_font = self.set_modified(
-            self.command.wordwrap_font,
-            wordwrap_font,
-        )
         wordwrap_pagewidth = int(self.ui.GetPropertyValueAsLongLong(self.PAGE_WITDH))
-        self.command.wordwrap_pagewidth = self.set_modified(
-            self.command.wordwrap_pagewidth,
-            wordwrap_pagewidth,
+
+        self.apply_changes(
+            [
+                ("slide_range", get_value(self.SLIDE_RANGE)),
+                ("repeat_range", get_value(self.REPEAT_RANGE)),
+                ("replace_texts", lines),
+                ("preprocessing_script", preprocessing_script),
+                ("archive_lyric_file", self.ui.GetPropertyValueAsBool(self.ARCHIVE_LYRIC_FILES)),
+                ("optional_line_break", optional_line_break),
+                ("enable_wordwrap", self.ui.GetPropertyValueAsBool(self.ENABLE_WORDWRAP)),
+                ("wordwrap_font", wordwrap_font),
+                ("wordwrap_pagewidth", wordwrap_pagewidth),
+            ]
         )
 
         return True
@@ -838,17 +797,17 @@ class DuplicateWithTextUI(PropertyGridUI):
         self.SetPropertyValueString(self.SLIDE_RANGE, self.command.slide_range)
         self.SetPropertyValueString(self.REPEAT_RANGE, self.command.repeat_range)
 
-        self.ui.SetPropertyValueString(self.FIND_TEXT, self.command.find_text)
+        self.SetPropertyValueString(self.FIND_TEXT, self.command.find_text)
         replace_texts = "\n\n".join(self.command.replace_texts)
         replace_texts = escape_backslash(replace_texts)
-        self.ui.SetPropertyValueString(self.REPLACE_TEXT, replace_texts)
+        self.SetPropertyValueString(self.REPLACE_TEXT, replace_texts)
 
         preprocessing_script = self.command.preprocessing_script
         preprocessing_script = escape_backslash(preprocessing_script)
-        self.ui.SetPropertyValueString(self.PREPROCESS_SCRIPT, preprocessing_script)
+        self.SetPropertyValueString(self.PREPROCESS_SCRIPT, preprocessing_script)
 
         self.ui.SetPropertyValue(self.ARCHIVE_LYRIC_FILES, self.command.archive_lyric_file)
-        self.ui.SetPropertyValueString(self.OPTION_SPLIT_LINE_AT_EVERY, str(self.command.optional_line_break))
+        self.SetPropertyValueString(self.OPTION_SPLIT_LINE_AT_EVERY, str(self.command.optional_line_break))
 
         self.ui.SetPropertyValue(self.ENABLE_WORDWRAP, self.command.enable_wordwrap)
 
@@ -875,6 +834,18 @@ class GenerateBibleVerseUI(PropertyGridUI):
     ADDITONAL_VERSES = _("Additional Bible verses")
     REPEAT_RANGE = _("Repeating slides range")
 
+    STRING_FIELDS = (
+        ("bible_version1", BIBLE_VERSION1),
+        ("main_verse_name1", MAIN_VERSE_NAME1),
+        ("each_verse_name1", EACH_VERSE_NAME1),
+        ("bible_version2", BIBLE_VERSION2),
+        ("main_verse_name2", MAIN_VERSE_NAME2),
+        ("each_verse_name2", EACH_VERSE_NAME2),
+        ("main_verses", MAIN_VERSES),
+        ("additional_verses", ADDITONAL_VERSES),
+        ("repeat_range", REPEAT_RANGE),
+    )
+
     def __init__(self, uimgr, name, proc=None):
         super().__init__(uimgr, name, proc=proc)
 
@@ -896,60 +867,6 @@ class GenerateBibleVerseUI(PropertyGridUI):
         pg.Append(wxpg.StringProperty(self.ADDITONAL_VERSES))
         pg.Append(wxpg.StringProperty(self.REPEAT_RANGE))
 
-    def TransferFromWindow(self):
-        self.command.bible_version1 = self.set_modified(
-            self.command.bible_version1,
-            self.ui.GetPropertyValueAsString(self.BIBLE_VERSION1),
-        )
-        self.command.main_verse_name1 = self.set_modified(
-            self.command.main_verse_name1,
-            self.ui.GetPropertyValueAsString(self.MAIN_VERSE_NAME1),
-        )
-        self.command.each_verse_name1 = self.set_modified(
-            self.command.each_verse_name1,
-            self.ui.GetPropertyValueAsString(self.EACH_VERSE_NAME1),
-        )
-
-        self.command.bible_version2 = self.set_modified(
-            self.command.bible_version2,
-            self.ui.GetPropertyValueAsString(self.BIBLE_VERSION2),
-        )
-        self.command.main_verse_name2 = self.set_modified(
-            self.command.main_verse_name2,
-            self.ui.GetPropertyValueAsString(self.MAIN_VERSE_NAME2),
-        )
-        self.command.each_verse_name2 = self.set_modified(
-            self.command.each_verse_name2,
-            self.ui.GetPropertyValueAsString(self.EACH_VERSE_NAME2),
-        )
-
-        self.command.main_verses = self.set_modified(self.command.main_verses, self.ui.GetPropertyValueAsString(self.MAIN_VERSES))
-        self.command.additional_verses = self.set_modified(
-            self.command.additional_verses,
-            self.ui.GetPropertyValueAsString(self.ADDITONAL_VERSES),
-        )
-        self.command.repeat_range = self.set_modified(
-            self.command.repeat_range,
-            self.ui.GetPropertyValueAsString(self.REPEAT_RANGE),
-        )
-
-        return True
-
-    def TransferToWindow(self):
-        self.SetPropertyValueString(self.BIBLE_VERSION1, self.command.bible_version1)
-        self.SetPropertyValueString(self.MAIN_VERSE_NAME1, self.command.main_verse_name1)
-        self.SetPropertyValueString(self.EACH_VERSE_NAME1, self.command.each_verse_name1)
-
-        self.SetPropertyValueString(self.BIBLE_VERSION2, self.command.bible_version2)
-        self.SetPropertyValueString(self.MAIN_VERSE_NAME2, self.command.main_verse_name2)
-        self.SetPropertyValueString(self.EACH_VERSE_NAME2, self.command.each_verse_name2)
-
-        self.SetPropertyValueString(self.MAIN_VERSES, self.command.main_verses)
-        self.SetPropertyValueString(self.ADDITONAL_VERSES, self.command.additional_verses)
-        self.SetPropertyValueString(self.REPEAT_RANGE, self.command.repeat_range)
-
-        return True
-
 
 class ExportSlidesUI(PropertyGridUI):
     proc_class = cmd.ExportSlides
@@ -977,10 +894,7 @@ class ExportSlidesUI(PropertyGridUI):
         pg.Append(wxpg.ColourProperty(self.TRANSPARENT_COLOR))
 
     def TransferFromWindow(self):
-        self.command.slide_range = self.set_modified(self.command.slide_range, self.ui.GetPropertyValueAsString(self.SLIDE_RANGE))
-        self.command.image_type = self.set_modified(self.command.image_type, self.ui.GetPropertyValueAsString(self.IMAGE_TYPE))
-        self.command.out_dirname = self.set_modified(self.command.out_dirname, self.ui.GetPropertyValueAsString(self.OUTPUT_DIR))
-
+        get_value = self.ui.GetPropertyValueAsString
         cleanup_output_dir = self.ui.GetPropertyValueAsBool(self.CLEANUP_OUTPUT_DIR)
         transparent_image = self.ui.GetPropertyValueAsBool(self.TRANSPARENT_IMAGE)
         flags = 0
@@ -988,10 +902,18 @@ class ExportSlidesUI(PropertyGridUI):
             flags = flags | cmd.Export_CleanupFiles
         if transparent_image:
             flags = flags | cmd.Export_Transparent
-        self.command.flags = self.set_modified(self.command.flags, flags)
         color = self.ui.GetPropertyValue(self.TRANSPARENT_COLOR)
         str_color = color.GetAsString(wx.C2S_HTML_SYNTAX)
-        self.command.color = self.set_modified(self.command.color, str_color)
+
+        self.apply_changes(
+            [
+                ("slide_range", get_value(self.SLIDE_RANGE)),
+                ("image_type", get_value(self.IMAGE_TYPE)),
+                ("out_dirname", get_value(self.OUTPUT_DIR)),
+                ("flags", flags),
+                ("color", str_color),
+            ]
+        )
 
         return True
 
@@ -1031,15 +953,20 @@ class ExportShapesUI(PropertyGridUI):
         pg.Append(wxpg.BoolProperty(self.CLEANUP_OUTPUT_DIR))
 
     def TransferFromWindow(self):
-        self.command.slide_range = self.set_modified(self.command.slide_range, self.ui.GetPropertyValueAsString(self.SLIDE_RANGE))
-        self.command.image_type = self.set_modified(self.command.image_type, self.ui.GetPropertyValueAsString(self.IMAGE_TYPE))
-        self.command.out_dirname = self.set_modified(self.command.out_dirname, self.ui.GetPropertyValueAsString(self.OUTPUT_DIR))
-
+        get_value = self.ui.GetPropertyValueAsString
         cleanup_output_dir = self.ui.GetPropertyValueAsBool(self.CLEANUP_OUTPUT_DIR)
         flags = 0
         if cleanup_output_dir:
             flags = flags | cmd.Export_CleanupFiles
-        self.command.flags = self.set_modified(self.command.flags, flags)
+
+        self.apply_changes(
+            [
+                ("slide_range", get_value(self.SLIDE_RANGE)),
+                ("image_type", get_value(self.IMAGE_TYPE)),
+                ("out_dirname", get_value(self.OUTPUT_DIR)),
+                ("flags", flags),
+            ]
+        )
 
         return True
 
@@ -1105,39 +1032,39 @@ class CommandEncoder(json.JSONEncoder):
 
     format_map = {fo.__name__: fo for fo in format_list}
 
+    flatten_map = {}  # type to its get_flattened_dict function or None
+
     def default(self, o):
-        if (func := getattr(o, "get_flattened_dict", None)) and callable(func):
-            return o.get_flattened_dict()
+        cls = type(o)
+        func = self.flatten_map.get(cls, False)
+        if func is False:
+            func = getattr(cls, "get_flattened_dict", None)
+            if not callable(func):
+                func = None
+            self.flatten_map[cls] = func
+
+        if func is not None:
+            return func(o)
         else:
             return o.__dict__
 
-        return o
-
     @staticmethod
     def decoder(o):
         if "type" in o:
-            proc_type = o["type"]
-            ui_name = o["name"]
-            enabled = True
-            if "enabled" in o:
-                enabled = o["enabled"]
-            data = o["data"]
-            if proc_type in CommandEncoder.proc_map:
-                uicls = CommandEncoder.proc_map[proc_type]
-                ui = uicls(None, ui_name)
-
-                ui.command.__dict__.update(data)
-                ui.command.enabled = enabled
+            uicls = CommandEncoder.proc_map.get(o["type"])
+            if uicls is not None:
+                ui = uicls(None, o["name"])
+
+                ui.command.__dict__.update(o["data"])
+                ui.command.enabled = o.get("enabled", True)
 
                 return ui
             else:
                 # unsupported type
                 return None
         elif "format_type" in o:
-            format_type = o["format_type"]
-            del o["format_type"]
-            if format_type in CommandEncoder.format_map:
-                fobj_cls = CommandEncoder.format_map[format_type]
+            fobj_cls = CommandEncoder.format_map.get(o.pop("format_type"))
+            if fobj_cls is not None:
                 fobj = fobj_cls()
 
                 fobj.__dict__.update(o)
@@ -1155,10 +1082,10 @@ class UIManager:
         self.modified = False
 
     def get_ui_mapping(self, name):
-        if name in self.ui_map:
-            return self.ui_map[name]
-
-        return None
+        """get_ui_mapping() returns the UI constructed for the command UI class name or None.
+        A property grid is constructed once per class and shared by all the commands of the class.
+        """
+        return self.ui_map.get(name)
 
     def set_ui_mapping(self, name, ui):
         self.ui_map[name] = ui
@@ -1261,8 +1188,10 @@ class UIManager:
                 mycmd = ui.command
                 mycmd.translate_dir_symbols(dss, to_symbol=True)
 
+        # json.dump() writes each small chunk to the file, so encode the whole list first and write it at once.
+        text = json.dumps(self.command_ui_list, indent=2, cls=CommandEncoder, ensure_ascii=False)
         with AtomicFileWriter(filename, "w", encoding="utf-8") as f:
-            json.dump(self.command_ui_list, f, indent=2, cls=CommandEncoder, ensure_ascii=False)
+            f.write(text)
 
         if len(dir_dict) > 0:
             # revert back the paths.
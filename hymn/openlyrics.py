@@ -10,11 +10,17 @@ from .hymncore import Line, Verse, Song
 
 
 class OpenLyricsReader:
+    """OpenLyricsReader keeps no state between read_song() calls,
+    so one reader can be shared and used from multiple threads.
+    """
+
+    NAMESPACES = {"ns": "http://openlyrics.info/namespace/2009/song"}
+
     def _get_extension(self):
         return ".xml"
 
     def read_song(self, filename):
-        ns = {"ns": "http://openlyrics.info/namespace/2009/song"}
+        ns = self.NAMESPACES
 
         tree = ET.parse(filename)
         root = tree.getroot()
@@ -91,6 +91,7 @@ class Frame(wx.Frame):
         self.pconfig = pc.PreferencesConfig()
         self.pconfig.read_config(self.config)
         cmdui.GenerateBibleVerseUI.current_bible_format = self.pconfig.current_bible_format
+        cmdui.MyFileProperty.main_frame = self
         bibfileformat.set_format_option(self.pconfig.current_bible_format, "ROOT_DIR", self.pconfig.bible_rootdir)
 
         self.filehistory = wx.FileHistory(8)